@@ -0,0 +1,308 @@
+#!/usr/bin/python2
+"""
+Headless benchmarks of color math, palette approximation and highlight
+line parsing. Inputs come from a fixed seed, results are printed as JSON
+(seconds per operation, best of several runs) for comparing runs:
+
+    ./bench.py -o before.json
+    ./bench.py --compare before.json
+
+With --compare exits with 1 if any benchmark got slower than the
+baseline by more than --tolerance.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from collections import OrderedDict
+from cStringIO import StringIO
+import colorop
+import metrics
+from colorop import rgb_to_xyz, xyz_to_laab, rgb_to_laab, color_diff_laab, numpy
+from color import Color, Palette
+from palettes import CTERM_RGB, CTERM_LAAB, TERM_RGB, TERM_LAAB
+from highlight import parse_line
+from convert import convert_stream
+
+BENCHMARKS = OrderedDict()
+
+def benchmark(name, numpy_only=False):
+    """
+    Registers benchmark setup: function of (random, scale) returning
+    (function to time, number of operations it does, extra report values).
+    Callable extra values are read after the runs (like skip_rate).
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = (setup, numpy_only)
+        return setup
+
+    return register
+
+def random_colors(rnd, count):
+    return [Color(rnd.randrange(1 << 24)) for _ in xrange(count)]
+
+def cterm():
+    return Palette.precomputed(CTERM_RGB, CTERM_LAAB)
+
+def term():
+    return Palette.precomputed(TERM_RGB, TERM_LAAB)
+
+def colorscheme(rnd, count):
+    """Synthetic colorscheme with count highlight lines"""
+
+    lines = ['" synthetic colorscheme\n', 'set background=dark\n']
+    for i in xrange(count):
+        lines.append('hi Group%d guifg=#%06x guibg=#%06x gui=bold\n' % (
+            i, rnd.randrange(1 << 24), rnd.randrange(1 << 24)
+        ))
+    return ''.join(lines)
+
+# single calls
+
+@benchmark('colorop.rgb_to_xyz')
+def bench_rgb_to_xyz(rnd, scale):
+    rgbs = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in xrange(10000 * scale)]
+    return lambda: [rgb_to_xyz(*rgb) for rgb in rgbs], len(rgbs), {}
+
+@benchmark('colorop.xyz_to_laab')
+def bench_xyz_to_laab(rnd, scale):
+    xyzs = [rgb_to_xyz(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in xrange(10000 * scale)]
+    return lambda: [xyz_to_laab(*xyz) for xyz in xyzs], len(xyzs), {}
+
+@benchmark('colorop.rgb_to_laab')
+def bench_rgb_to_laab(rnd, scale):
+    rgbs = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in xrange(10000 * scale)]
+    return lambda: [rgb_to_laab(*rgb) for rgb in rgbs], len(rgbs), {}
+
+@benchmark('colorop.color_diff_laab')
+def bench_color_diff_laab(rnd, scale):
+    pairs = [(color.laab, other.laab) for color, other in
+             zip(random_colors(rnd, 10000 * scale), random_colors(rnd, 10000 * scale))]
+    return lambda: [color_diff_laab(c1, c2) for c1, c2 in pairs], len(pairs), {}
+
+@benchmark('Color')
+def bench_color(rnd, scale):
+    specs = ['#%06x' % rnd.randrange(1 << 24) for _ in xrange(10000 * scale)]
+    return lambda: [Color(spec) for spec in specs], len(specs), {}
+
+@benchmark('highlight.parse_line')
+def bench_parse_line(rnd, scale):
+    lines = colorscheme(rnd, 5000 * scale).splitlines(True)
+    return lambda: [parse_line(line) for line in lines], len(lines), {}
+
+# full palette scans
+
+def bench_scan(palette, method, rnd, scale, count=500):
+    targets = random_colors(rnd, count * scale)
+    palette.reset_stats()
+    run = lambda: [getattr(palette, method)(target) for target in targets]
+    return run, len(targets), {'palette': len(palette), 'skip_rate': lambda: palette.skip_rate}
+
+@benchmark('Palette.approximate_scan[CTERM]')
+def bench_scan_cterm(rnd, scale):
+    return bench_scan(cterm(), 'approximate_scan', rnd, scale, 100)
+
+@benchmark('Palette.approximate_uncached[CTERM]')
+def bench_uncached_cterm(rnd, scale):
+    return bench_scan(cterm(), 'approximate_uncached', rnd, scale)
+
+@benchmark('Palette.approximate_uncached[TERM]')
+def bench_uncached_term(rnd, scale):
+    return bench_scan(term(), 'approximate_uncached', rnd, scale)
+
+@benchmark('Palette.approximate_pruned[CTERM]')
+def bench_pruned_cterm(rnd, scale):
+    return bench_scan(cterm(), 'approximate_pruned', rnd, scale)
+
+@benchmark('Palette.approximate_tree[CTERM]')
+def bench_tree_cterm(rnd, scale):
+    return bench_scan(cterm(), 'approximate_tree', rnd, scale)
+
+@benchmark('Palette.approximate[CTERM, cached]')
+def bench_cached_cterm(rnd, scale):
+    palette = cterm()
+    targets = random_colors(rnd, 1000) * (10 * scale)
+    for target in targets[:1000]:
+        palette.approximate(target)
+    return lambda: [palette.approximate(target) for target in targets], len(targets), {}
+
+def bench_miss(palette, rnd, scale, count=500):
+    targets = random_colors(rnd, count * scale)
+
+    def run():
+        palette.cache.clear()
+        return [palette.approximate(target) for target in targets]
+
+    return run, len(targets), {'palette': len(palette)}
+
+@benchmark('Palette.approximate[CTERM, miss]')
+def bench_miss_cterm(rnd, scale):
+    return bench_miss(cterm(), rnd, scale)
+
+@benchmark('Palette.approximate[TERM, miss]')
+def bench_miss_term(rnd, scale):
+    return bench_miss(term(), rnd, scale)
+
+@benchmark('Palette.nearest[CTERM, k=5]')
+def bench_nearest_cterm(rnd, scale):
+    palette = cterm()
+    targets = random_colors(rnd, 500 * scale)
+    return lambda: [palette.nearest(target, 5) for target in targets], len(targets), {}
+
+@benchmark('Palette.matrix[CTERM]', numpy_only=True)
+def bench_matrix_cterm(rnd, scale):
+    palette = cterm()
+
+    def run():
+        palette.invalidate()
+        return palette.matrix
+
+    return run, len(palette) ** 2, {}
+
+# sampled sweeps over all 16M colors
+
+def sweep_sample(rnd, scale):
+    """Every stride-th color of the RGB cube starting at random offset"""
+
+    count = 16384 * scale
+    stride = (1 << 24) / count
+    offset = rnd.randrange(stride)
+    return [Color(rgb) for rgb in xrange(offset, 1 << 24, stride)]
+
+@benchmark('sweep.approximate_many[CTERM]')
+def bench_sweep_cterm(rnd, scale):
+    palette = cterm()
+    targets = sweep_sample(rnd, scale)
+    palette.reset_stats()
+    run = lambda: palette.approximate_many(targets)
+    return run, len(targets), {'palette': len(palette), 'skip_rate': lambda: palette.skip_rate}
+
+@benchmark('sweep.approximate_many[TERM]')
+def bench_sweep_term(rnd, scale):
+    palette = term()
+    targets = sweep_sample(rnd, scale)
+    return lambda: palette.approximate_many(targets), len(targets), {'palette': len(palette)}
+
+@benchmark('sweep.rgb_to_laab_batch', numpy_only=True)
+def bench_sweep_laab(rnd, scale):
+    rgb = numpy.array([color.rgb for color in sweep_sample(rnd, scale * 16)], dtype=numpy.uint32)
+    rgb = numpy.stack((rgb >> 16, (rgb >> 8) & 0xff, rgb & 0xff), axis=-1)
+    return lambda: colorop.rgb_to_laab_batch(rgb), len(rgb), {}
+
+# whole colorschemes
+
+@benchmark('convert_stream')
+def bench_convert(rnd, scale):
+    text = colorscheme(rnd, 2000 * scale)
+
+    def run():
+        # fresh palettes, so caches of previous runs don't help
+        palettes = {'CTERM': cterm(), 'TERM': term()}
+        convert_stream(StringIO(text), StringIO(), palettes)
+
+    return run, text.count('\n'), {}
+
+def run(names, seed, scale, repeat):
+    results = OrderedDict()
+
+    for name in names:
+        setup, numpy_only = BENCHMARKS[name]
+        if numpy_only and numpy is None:
+            continue
+
+        func, count, extra = setup(random.Random(seed), scale)
+
+        best = None
+        for _ in xrange(repeat):
+            started = time.time()
+            func()
+            elapsed = time.time() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        result = OrderedDict([
+            ('seconds', best / count),
+            ('ops_per_second', count / best if best else None),
+            ('count', count),
+        ])
+
+        for key, value in sorted(extra.items()):
+            result[key] = value() if callable(value) else value
+
+        results[name] = result
+        sys.stderr.write('%-40s %12.3f us/op\n' % (name, best / count * 1e6))
+
+    return results
+
+def compare(results, baseline, tolerance):
+    """Returns names of benchmarks slower than baseline by more than tolerance"""
+
+    slower = []
+    for name, result in results.iteritems():
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            continue
+
+        ratio = result['seconds'] / old['seconds']
+        sys.stderr.write('%-40s %6.2fx\n' % (name, ratio))
+        if ratio > 1 + tolerance:
+            slower.append(name)
+
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run (substrings of names), all by default')
+    parser.add_argument('-l', '--list', action='store_true', help='list benchmarks and exit')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='random seed (default: %(default)s)')
+    parser.add_argument('-n', '--scale', type=int, default=1, help='input size multiplier (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per benchmark, best one counts (default: %(default)s)')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write JSON to FILE instead of standard output')
+    parser.add_argument('-c', '--compare', metavar='FILE', help='baseline JSON from previous run')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against baseline (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS
+             if not args.names or any(part in name for part in args.names)]
+
+    if args.list:
+        print '\n'.join(names)
+        return 0
+
+    report = OrderedDict([
+        ('meta', OrderedDict([
+            ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+            ('python', platform.python_version()),
+            ('numpy', numpy.__version__ if numpy is not None else None),
+            ('platform', platform.platform()),
+            ('seed', args.seed),
+            ('scale', args.scale),
+            ('repeat', args.repeat),
+            ('metric', metrics.CIEDE2000),
+        ])),
+        ('results', run(names, args.seed, args.scale, args.repeat)),
+    ])
+
+    text = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(report['results'], json.load(f), args.tolerance)
+        if slower:
+            sys.stderr.write('slower than baseline: %s\n' % ', '.join(slower))
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,71 +1,621 @@
 """
 Color wrapper and palette implementation.
 """
-import gtk
-from colorop import rgb_to_xyz, xyz_to_laab, color_diff_laab
+import lut
+import heapq
+import stats
+import metrics
+from string import hexdigits
+from collections import OrderedDict
+from kdtree import KDTree
+from palettes import GUI_COLORS
+from colorop import rgb_to_laab, color_diff_laab, \
+                    color_diff_laab_batch, color_diff_laab_bound, \
+                    color_diff_laab_pair_bound, nearest_laab_batch, numpy
 
-class Color:
-    def __init__(self, string):
-        if isinstance(string, str):
-            self.gtk = gtk.gdk.color_parse(string)
-        elif isinstance(string, gtk.gdk.Color):
-            self.gtk = string
+class Color(object):
+    """
+    Immutable color, stores packed 24-bit RGB value and its L*ab version
+    (because CIEDE2000 works with L*ab to save some CPU time).
 
-        # because CIEDE2000 works with L*ab to save some CPU time
-        # L*ab version of color is stored too
-        self.laab = xyz_to_laab(*rgb_to_xyz(self.red, self.green, self.blue))
+    Accepts '#rgb'-style hex strings (3, 6, 9 or 12 digits), GUI color
+    names, packed integers and (r, g, b) tuples.
+    """
+
+    __slots__ = ('rgb', 'laab')
+
+    def __init__(self, value):
+        if isinstance(value, basestring):
+            value = self.parse_string(value)
+        elif isinstance(value, tuple):
+            value = (value[0] << 16) | (value[1] << 8) | value[2]
+        elif isinstance(value, Color):
+            value = value.rgb
+
+        if not isinstance(value, (int, long)) or not 0 <= value <= 0xffffff:
+            raise ValueError('Invalid color: %r' % (value,))
+
+        self.rgb = value
+        self.laab = rgb_to_laab(self.red, self.green, self.blue)
+
+    @staticmethod
+    def parse_string(string):
+        """Converts color specification to packed RGB value"""
+
+        spec = string.strip()
+
+        if not spec.startswith('#'):
+            spec = GUI_COLORS.get(spec.lower().replace(' ', ''))
+            if spec is None:
+                raise ValueError('Unknown color name: %s' % string)
+
+        digits = spec[1:]
+        if len(digits) not in (3, 6, 9, 12) or digits.strip(hexdigits):
+            raise ValueError('Invalid color: %s' % string)
+
+        width = len(digits) / 3
+        channels = [int(digits[i * width:(i + 1) * width], 16) for i in xrange(3)]
+
+        if width == 1:
+            channels = [c * 17 for c in channels]
+        else:
+            channels = [c >> (4 * (width - 2)) for c in channels]
+
+        return (channels[0] << 16) | (channels[1] << 8) | channels[2]
+
+    def __sub__(self, other):
+        # palette_color - target, i.e. distance from target to palette color
+        return color_diff_laab(other.laab, self.laab)
 
     def __rsub__(self, other):
         return color_diff_laab(self.laab, other.laab)
 
     def __eq__(self, other):
-        return self.gtk == other.gtk
+        return isinstance(other, Color) and self.rgb == other.rgb
 
     def __ne__(self, other):
-        return self.gtk != other.gtk
+        return not self == other
 
     def __lt__(self, other):
-        return self.gtk < other.gtk
+        return self.rgb < other.rgb
 
     def __gt__(self, other):
-        return self.gtk > other.gtk
+        return self.rgb > other.rgb
 
     def __le__(self, other):
-        return self.gtk <= other.gtk
+        return self.rgb <= other.rgb
 
     def __ge__(self, other):
-        return self.gtk >= other.gtk
+        return self.rgb >= other.rgb
+
+    def __hash__(self):
+        return self.rgb
 
     @property
     def red(self):
-        return self.gtk.red / 256
+        return self.rgb >> 16
 
     @property
     def green(self):
-        return self.gtk.green / 256
+        return (self.rgb >> 8) & 0xff
 
     @property
     def blue(self):
-        return self.gtk.blue / 256
+        return self.rgb & 0xff
 
     def __str__(self):
-        return '#%02x%02x%02x' % (self.red, self.green, self.blue)
+        return '#%06x' % self.rgb
 
     def full_str(self):
-        return self.gtk.to_string()
+        return '#%04x%04x%04x' % (self.red * 257, self.green * 257, self.blue * 257)
 
     def __repr__(self):
         return '<Color: %s>' % str(self)
 
     @classmethod
     def parse(self, string):
-        return self(string)
+        return string if isinstance(string, self) else self(string)
+
+    @classmethod
+    def precomputed(cls, rgb, laab):
+        """Creates color from packed RGB and its known L*ab, no conversion is done"""
+
+        color = cls.__new__(cls)
+        color.rgb = rgb
+        color.laab = laab
+        return color
+
+class LRUCache(object):
+    """Bounded mapping that evicts least recently used keys"""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            value = self.data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.data[key] = value  # move to the end, i.e. most recent
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data.pop(key, None)
+        self.data[key] = value
+
+        if len(self.data) > self.size:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+def _invalidating(name):
+    """Wraps list method so that palette drops derived data after it"""
+
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        try:
+            return method(self, *args)
+        finally:
+            self.invalidate()
+
+    wrapper.__name__ = name
+    return wrapper
 
 class Palette(list):
-    def __init__(self, colors):
+    # palettes at least this big are searched with k-d tree,
+    # vectorized scan stays faster for much longer than scalar one
+    TREE_THRESHOLD = 1024
+    TREE_THRESHOLD_NUMPY = 32768
+
+    # smaller palettes are matched with scalar pruned scan even with NumPy,
+    # array setup costs more than the few exact distances it needs
+    PRUNED_THRESHOLD_NUMPY = 64
+
+    # number of remembered approximations
+    CACHE_SIZE = 4096
+
+    # number of remembered nearest() results
+    NEAREST_CACHE_SIZE = 256
+
+    # colors closer than this (CIEDE2000) are considered near-duplicates
+    DUPLICATE_DELTA = 1.0
+
+    # rows of distance matrix computed at once
+    MATRIX_CHUNK = 64
+
+    def __init__(self, colors, metric=metrics.CIEDE2000):
         super(Palette, self).__init__(map(Color.parse, colors))
+        # name of distance metric (see metrics.py) used by default
+        self.metric = metrics.get(metric).name
+        self._laab = None
+        self._matrix = None
+        self._tree = None
+        self._coords = {}
+        # index tables to other palettes, see map_to
+        self._mappings = {}
+        self.lut = None
+        self.lut_metric = None
+        self.cache = LRUCache(self.CACHE_SIZE)
+        self.nearest_cache = LRUCache(self.NEAREST_CACHE_SIZE)
+        # persistent cache, see diskcache.py
+        self.disk = None
+        self._hash = None
+        self.reset_stats()
+
+    @classmethod
+    def precomputed(cls, rgbs, laabs, metric=metrics.CIEDE2000):
+        """Palette of packed RGB values with known L*ab (see palettes.py)"""
+        return cls(map(Color.precomputed, rgbs, laabs), metric)
+
+    __setitem__ = _invalidating('__setitem__')
+    __delitem__ = _invalidating('__delitem__')
+    __setslice__ = _invalidating('__setslice__')
+    __delslice__ = _invalidating('__delslice__')
+    __iadd__ = _invalidating('__iadd__')
+    __imul__ = _invalidating('__imul__')
+    append = _invalidating('append')
+    extend = _invalidating('extend')
+    insert = _invalidating('insert')
+    pop = _invalidating('pop')
+    remove = _invalidating('remove')
+    reverse = _invalidating('reverse')
+    sort = _invalidating('sort')
+
+    def invalidate(self):
+        """Drops everything computed from palette contents"""
+        self._laab = None
+        self._matrix = None
+        self._tree = None
+        self._coords.clear()
+        self._mappings.clear()
+        self.lut = None
+        self.lut_metric = None
+        self.cache.clear()
+        self.nearest_cache.clear()
+        self._hash = None
+
+    def reset_stats(self):
+        # number of exact CIEDE2000 computations done and skipped thanks to bounds
+        self.evaluated = 0
+        self.skipped = 0
+
+    @property
+    def skip_rate(self):
+        """Share of CIEDE2000 computations avoided by lower bounds"""
+
+        total = self.evaluated + self.skipped
+        return self.skipped / float(total) if total else 0.0
+
+    def _count(self, evaluated, total):
+        self.evaluated += evaluated
+        self.skipped += total - evaluated
+
+    def use_lut(self, create=True, progress=None):
+        """
+        Switches approximation to precomputed 24-bit lookup table.
+        See lut.load for arguments, returns True if table is in use.
+        """
+
+        self.lut = lut.load(self, create, progress, self.metric)
+        self.lut_metric = self.metric
+        return self.lut is not None
+
+    def use_disk_cache(self, cache):
+        """Keeps approximations in diskcache.DiskCache across sessions"""
+
+        self.disk = cache
+
+    @property
+    def hash(self):
+        """Identifies palette contents in persistent caches"""
+
+        if self._hash is None:
+            self._hash = lut.palette_hash(self)
+        return self._hash
+
+    def _disk_get(self, metric, rgb):
+        if self.disk is None:
+            return None
+
+        return self.disk.get(self.hash, metric, rgb)
+
+    def _disk_put(self, metric, rgb, matched_index):
+        if self.disk is not None:
+            self.disk.add(self.hash, metric, rgb, matched_index)
+
+    def map_to(self, other, metric=None):
+        """
+        Returns table of other palette's indexes nearest to every color
+        of this one, computed once per other's contents and metric
+        (other's default one unless given).
+        """
+
+        metric = metric or other.metric
+        key = (other.hash, metric)
+
+        if key not in self._mappings:
+            self._mappings[key] = other.approximate_many(self, metric=metric)
+
+        return self._mappings[key]
+
+    def add_mapping(self, other, table, metric=metrics.CIEDE2000):
+        """Stores precomputed map_to table (see palettes.CTERM_TO_TERM)"""
+        self._mappings[other.hash, metric] = table
+
+    @property
+    def tree(self):
+        """k-d tree over L*ab values of palette colors"""
+
+        if self._tree is None:
+            self._tree = KDTree([color.laab for color in self])
+        return self._tree
+
+    @property
+    def laab(self):
+        """N x 3 array of L*ab values of palette colors (requires NumPy)"""
+
+        if self._laab is None:
+            self._laab = numpy.array([color.laab for color in self], dtype=numpy.float64)
+        return self._laab
+
+    @property
+    def matrix(self):
+        """N x N float32 array of CIEDE2000 distances between palette colors (requires NumPy)"""
+
+        if self._matrix is None:
+            laab = self.laab
+            matrix = numpy.empty((len(self), len(self)), dtype=numpy.float32)
+
+            # row of every color is its distances() as target
+            for start in xrange(0, len(self), self.MATRIX_CHUNK):
+                end = start + self.MATRIX_CHUNK
+                matrix[start:end] = color_diff_laab_batch(laab[start:end, None], laab[None, :])
+
+            self._matrix = matrix
+
+        return self._matrix
+
+    def coordinates(self, metric):
+        """Palette colors in space of given metric (N x 3 array if NumPy is available)"""
+
+        if metric not in self._coords:
+            coords = [metrics.get(metric).coords(color) for color in self]
+            if numpy is not None:
+                coords = numpy.array(coords, dtype=numpy.float64)
+            self._coords[metric] = coords
+
+        return self._coords[metric]
+
+    def distances(self, target):
+        """CIEDE2000 distances from target to every palette color"""
+
+        if numpy is None:
+            return [color - target for color in self]
+
+        return color_diff_laab_batch(target.laab, self.laab)
+
+    @stats.timed('Palette.approximate')
+    def approximate(self, target, metric=None):
+        """
+        Finds palette color nearest to target, returns (index, color).
+        metric overrides palette's default one.
+        """
+
+        metric = metric or self.metric
+
+        if self.lut is not None and self.lut_metric == metric:
+            matched_index = int(self.lut[target.rgb])
+            return matched_index, self[matched_index]
+
+        matched_index = self.cache.get((metric, target.rgb))
+        if matched_index is None:
+            matched_index = self._disk_get(metric, target.rgb)
+            if matched_index is None:
+                matched_index = self.approximate_uncached(target, metric)[0]
+                self._disk_put(metric, target.rgb, matched_index)
+            self.cache.put((metric, target.rgb), matched_index)
+
+        return matched_index, self[matched_index]
+
+    def approximate_uncached(self, target, metric=None):
+        metric = metric or self.metric
+
+        if metric != metrics.CIEDE2000:
+            return self.approximate_metric(target, metric)
+
+        if len(self) >= (self.TREE_THRESHOLD if numpy is None else self.TREE_THRESHOLD_NUMPY):
+            return self.approximate_tree(target)
+
+        if numpy is None or len(self) < self.PRUNED_THRESHOLD_NUMPY:
+            return self.approximate_pruned(target)
+
+        # bounds of nearest_laab_batch pay off only for many targets
+        self._count(len(self), len(self))
+        matched_index = int(self.distances(target).argmin())
+        return matched_index, self[matched_index]
+
+    def approximate_metric(self, target, metric):
+        """Plain (vectorized if possible) scan with any metric"""
+
+        metric = metrics.get(metric)
+        coords = self.coordinates(metric.name)
+        point = metric.coords(target)
+
+        if numpy is not None and self:
+            matched_index = int(metric.diff_batch(point, coords).argmin())
+        else:
+            diffs = [metric.diff(point, other) for other in coords]
+            matched_index = diffs.index(min(diffs))
+
+        return matched_index, self[matched_index]
+
+    @stats.timed('Palette.nearest')
+    def nearest(self, target, k=5, metric=None):
+        """
+        Returns up to k best matches for target as [(index, diff), ...],
+        best first (ties go to lower index, like approximate() does).
+        """
+
+        key = (metric or self.metric, target.rgb, k)
+        matches = self.nearest_cache.get(key)
+        if matches is None:
+            matches = self.nearest_uncached(target, k, metric)
+            self.nearest_cache.put(key, matches)
+
+        return list(matches)
+
+    def nearest_uncached(self, target, k=5, metric=None):
+        """nearest() without cache, uses partial selection so palette is never fully sorted"""
+
+        metric = metrics.get(metric or self.metric)
+        coords = self.coordinates(metric.name)
+        point = metric.coords(target)
+        k = min(k, len(self))
+
+        if k <= 0:
+            return []
+
+        self._count(len(self), len(self))
+
+        if numpy is None:
+            diffs = (metric.diff(point, other) for other in coords)
+            return [(index, diff) for diff, index in
+                    heapq.nsmallest(k, ((diff, index) for index, diff in enumerate(diffs)))]
+
+        diffs = metric.diff_batch(point, coords)
+        # everything up to k-th value, so that ties at the edge are resolved by index
+        kth = numpy.partition(diffs, k - 1)[k - 1]
+        candidates = numpy.flatnonzero(diffs <= kth)
+        candidates = candidates[numpy.lexsort((candidates, diffs[candidates]))][:k]
+
+        return [(int(index), float(diffs[index])) for index in candidates]
+
+    def similar(self, index, k=5, delta=None):
+        """
+        Returns palette colors closest to color at index (except itself)
+        as [(index, diff), ...], best first: up to k of them (all if k is
+        None), only those closer than delta if it's given.
+        Uses distance matrix if NumPy is available.
+        """
+
+        if numpy is None:
+            count = len(self) if k is None or delta is not None else k + 1
+            matches = [match for match in self.nearest(self[index], count, metrics.CIEDE2000)
+                       if match[0] != index and (delta is None or match[1] < delta)]
+            return matches[:k]
+
+        row = self.matrix[index]
+
+        if delta is not None:
+            candidates = numpy.flatnonzero(row < delta)
+        else:
+            candidates = numpy.arange(len(self))
+
+        candidates = candidates[candidates != index]
+        candidates = candidates[numpy.lexsort((candidates, row[candidates]))][:k]
+
+        return [(int(other), float(row[other])) for other in candidates]
+
+    def near_duplicates(self, index, delta=DUPLICATE_DELTA):
+        """Indexes of colors hardly distinguishable from color at index"""
+        return [other for other, diff in self.similar(index, None, delta)]
+
+    def approximate_steps(self, target, chunk=2048, metric=None):
+        """
+        Incremental approximate() for big palettes: scans chunk colors
+        per step and yields None after each step, the last value yielded
+        is (index, color). Lets GUI spread the work over idle callbacks.
+        Metrics other than CIEDE2000 are cheap and done in one step.
+        """
+
+        metric = metric or self.metric
+
+        if metric != metrics.CIEDE2000 or (self.lut is not None and self.lut_metric == metric):
+            yield self.approximate(target, metric)
+            return
+
+        matched_index = self.cache.get((metric, target.rgb))
+        if matched_index is None:
+            matched_index = self._disk_get(metric, target.rgb)
+            if matched_index is not None:
+                self.cache.put((metric, target.rgb), matched_index)
+
+        if matched_index is None:
+            matched_diff = None
+
+            for start in xrange(0, len(self), chunk):
+                end = min(start + chunk, len(self))
+
+                if numpy is not None:
+                    index = start + int(nearest_laab_batch([target.laab], self.laab[start:end])[0][0])
+                    diff = self[index] - target
+                else:
+                    index, diff = start, None
+                    for i in xrange(start, end):
+                        value = self[i] - target
+                        if diff is None or diff > value:
+                            index, diff = i, value
+
+                if matched_diff is None or matched_diff > diff:
+                    matched_index, matched_diff = index, diff
+
+                if end < len(self):
+                    yield None
+
+            self._disk_put(metric, target.rgb, matched_index)
+            self.cache.put((metric, target.rgb), matched_index)
+
+        yield matched_index, self[matched_index]
+
+    def approximate_many(self, targets, chunk=1024, metric=None):
+        """Approximates list of colors at once, returns list of indexes"""
+
+        metric = metric or self.metric
+
+        if metric != metrics.CIEDE2000 or (self.lut is not None and self.lut_metric == metric):
+            return [self.approximate(target, metric)[0] for target in targets]
+
+        if numpy is None or not self:
+            return [self.approximate_pruned(target)[0] for target in targets]
+
+        targets = numpy.array([target.laab for target in targets], dtype=numpy.float64)
+        result = []
+
+        # chunks keep temporary N x M arrays reasonably sized
+        for start in xrange(0, len(targets), chunk):
+            chunk_targets = targets[start:start + chunk]
+            indexes, evaluated = nearest_laab_batch(chunk_targets, self.laab)
+            self._count(evaluated, len(chunk_targets) * len(self))
+            result.extend(indexes.tolist())
+
+        return result
+
+    def approximate_tree(self, target):
+        """
+        Checks colors in order of CIE76 distance until lower bound of CIEDE2000
+        for the remaining ones exceeds best match, result is the same as scan gives.
+        """
+
+        matched_index = 0
+        matched_diff = None
+        evaluated = 0
+
+        for distance, index in self.tree.nearest(target.laab):
+            if matched_diff is not None and \
+               color_diff_laab_bound(target.laab, distance) > matched_diff:
+                break
+
+            evaluated += 1
+            diff = self[index] - target
+            if matched_diff is None or matched_diff > diff or \
+               (matched_diff == diff and matched_index > index):
+                matched_diff, matched_index = diff, index
+
+        self._count(evaluated, len(self))
+        return matched_index, self[matched_index]
+
+    def approximate_pruned(self, target):
+        """
+        Scan that goes in order of cheap lower bounds and stops once bound
+        exceeds best match, result is the same as scan gives.
+        """
+
+        bounds = sorted(
+            (color_diff_laab_pair_bound(target.laab, color.laab), index)
+            for index, color in enumerate(self)
+        )
+
+        matched_index = 0
+        matched_diff = None
+        evaluated = 0
+
+        for bound, index in bounds:
+            if matched_diff is not None and bound > matched_diff:
+                break
+
+            evaluated += 1
+            diff = self[index] - target
+            if matched_diff is None or matched_diff > diff or \
+               (matched_diff == diff and matched_index > index):
+                matched_diff, matched_index = diff, index
+
+        self._count(evaluated, len(self))
+        return matched_index, self[matched_index]
+
+    def approximate_scan(self, target):
+        """Reference implementation: plain scan with scalar CIEDE2000"""
 
-    def approximate(self, target):
         matched_index = 0
         matched_diff = 10000
 
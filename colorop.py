@@ -3,9 +3,17 @@ Color operations.
 RGB -> XYZ -> L*ab
 + CIEDE2000 itself.
 All credits go to http://easyrgb.com
+
+Functions with _batch suffix are NumPy versions of the scalar ones,
+the scalar functions stay the reference implementation.
 """
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 REF_X = 95.047
 REF_Y = 100.000
 REF_Z = 108.883
@@ -34,6 +42,15 @@ def rgb_to_xyz(ro, go, bo):
         r * 0.0193 + g * 0.1192 + b * 0.9505
     )
 
+# xyz_color_norm of every 8-bit channel value, RGB input is always one of them
+LINEAR = [xyz_color_norm(x / 255.0) for x in xrange(256)]
+LINEAR_ARRAY = numpy.array(LINEAR) if numpy is not None else None
+
+# biggest absolute difference of rgb_to_laab_batch from the reference
+# xyz_to_laab(*rgb_to_xyz(...)) over all 24-bit colors, comes from
+# numpy.cbrt rounding differently than math.pow(c, 1 / 3.0)
+LAAB_BATCH_TOLERANCE = 1e-12
+
 def laab_color_norm(c):
     """Helper function for normalizing color during conversion to L*ab"""
 
@@ -56,6 +73,154 @@ def xyz_to_laab(x, y, z):
         200 * (var_y - var_z)
     )
 
+def rgb_to_laab(r, g, b):
+    """
+    Converts given RGB color to L*ab, linearization is taken from LINEAR
+    table, result is identical to xyz_to_laab(*rgb_to_xyz(r, g, b))
+    """
+
+    r, g, b = LINEAR[r], LINEAR[g], LINEAR[b]
+
+    return xyz_to_laab(
+        r * 0.4124 + g * 0.3576 + b * 0.1805,
+        r * 0.2126 + g * 0.7152 + b * 0.0722,
+        r * 0.0193 + g * 0.1192 + b * 0.9505
+    )
+
+def rgb_to_laab_batch(rgb):
+    """
+    Vectorized rgb_to_laab, rgb is integer array-like with triplets in the last axis.
+    Matches reference conversion within LAAB_BATCH_TOLERANCE.
+    """
+
+    rgb = numpy.take(LINEAR_ARRAY, numpy.asarray(rgb, dtype=numpy.intp))
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    xyz = numpy.stack((
+        (r * 0.4124 + g * 0.3576 + b * 0.1805) / REF_X,
+        (r * 0.2126 + g * 0.7152 + b * 0.0722) / REF_Y,
+        (r * 0.0193 + g * 0.1192 + b * 0.9505) / REF_Z
+    ), axis=-1)
+
+    xyz = numpy.where(xyz > 0.008856, numpy.cbrt(xyz), (7.787 * xyz) + (16 / 116.0))
+    var_x, var_y, var_z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+
+    return numpy.stack((
+        (116 * var_y) - 16,
+        500 * (var_x - var_y),
+        200 * (var_y - var_z)
+    ), axis=-1)
+
+def rgb_to_oklab(r, g, b):
+    """Converts given RGB color to OKLab (see https://bottosson.github.io/posts/oklab/)"""
+
+    r, g, b = LINEAR[r] / 100, LINEAR[g] / 100, LINEAR[b] / 100
+
+    l = math.pow(0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b, 1 / 3.0)
+    m = math.pow(0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b, 1 / 3.0)
+    s = math.pow(0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b, 1 / 3.0)
+
+    return (
+        0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+        1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+        0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s
+    )
+
+def rgb_to_oklab_batch(rgb):
+    """Vectorized rgb_to_oklab, rgb is integer array-like with triplets in the last axis"""
+
+    rgb = numpy.take(LINEAR_ARRAY, numpy.asarray(rgb, dtype=numpy.intp)) / 100
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    l = numpy.cbrt(0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b)
+    m = numpy.cbrt(0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b)
+    s = numpy.cbrt(0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b)
+
+    return numpy.stack((
+        0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+        1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+        0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s
+    ), axis=-1)
+
+def rgb_to_xyz_batch(rgb):
+    """Vectorized rgb_to_xyz, rgb is array-like with triplets in the last axis"""
+
+    rgb = numpy.asarray(rgb, dtype=numpy.float64) / 255.0
+    rgb = numpy.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92) * 100
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    return numpy.stack((
+        r * 0.4124 + g * 0.3576 + b * 0.1805,
+        r * 0.2126 + g * 0.7152 + b * 0.0722,
+        r * 0.0193 + g * 0.1192 + b * 0.9505
+    ), axis=-1)
+
+def xyz_to_laab_batch(xyz):
+    """Vectorized xyz_to_laab, xyz is array-like with triplets in the last axis"""
+
+    xyz = numpy.asarray(xyz, dtype=numpy.float64) / (REF_X, REF_Y, REF_Z)
+    xyz = numpy.where(xyz > 0.008856, xyz ** (1 / 3.0), (7.787 * xyz) + (16 / 116.0))
+    var_x, var_y, var_z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+
+    return numpy.stack((
+        (116 * var_y) - 16,
+        500 * (var_x - var_y),
+        200 * (var_y - var_z)
+    ), axis=-1)
+
+def color_diff_cie76(c1, c2):
+    """Euclidean distance between colors (CIE76 for L*ab)"""
+
+    d0, d1, d2 = c1[0] - c2[0], c1[1] - c2[1], c1[2] - c2[2]
+    return math.sqrt(d0 * d0 + d1 * d1 + d2 * d2)
+
+def color_diff_cie76_batch(c1, c2):
+    """Vectorized color_diff_cie76, broadcasting like color_diff_laab_batch"""
+
+    d = numpy.asarray(c1, dtype=numpy.float64) - numpy.asarray(c2, dtype=numpy.float64)
+    return numpy.sqrt((d * d).sum(axis=-1))
+
+def color_diff_cie94(c1, c2, whtl=1, whtc=1, whth=1):
+    """CIE94 (graphic arts constants) difference of L*ab colors, c1 is the reference"""
+
+    ciel1, ciea1, cieb1 = c1
+    ciel2, ciea2, cieb2 = c2
+
+    xC1 = math.sqrt(ciea1 * ciea1 + cieb1 * cieb1)
+    xC2 = math.sqrt(ciea2 * ciea2 + cieb2 * cieb2)
+    xDL = ciel1 - ciel2
+    xDC = xC1 - xC2
+    xDA = ciea1 - ciea2
+    xDB = cieb1 - cieb2
+    xDH = max(xDA * xDA + xDB * xDB - xDC * xDC, 0)
+
+    xSC = 1 + 0.045 * xC1
+    xSH = 1 + 0.015 * xC1
+
+    return math.sqrt((xDL / whtl) ** 2 + (xDC / (whtc * xSC)) ** 2 + xDH / (whth * xSH) ** 2)
+
+def color_diff_cie94_batch(c1, c2, whtl=1, whtc=1, whth=1):
+    """Vectorized color_diff_cie94, broadcasting like color_diff_laab_batch"""
+
+    c1 = numpy.asarray(c1, dtype=numpy.float64)
+    c2 = numpy.asarray(c2, dtype=numpy.float64)
+
+    ciel1, ciea1, cieb1 = c1[..., 0], c1[..., 1], c1[..., 2]
+    ciel2, ciea2, cieb2 = c2[..., 0], c2[..., 1], c2[..., 2]
+
+    xC1 = numpy.sqrt(ciea1 * ciea1 + cieb1 * cieb1)
+    xC2 = numpy.sqrt(ciea2 * ciea2 + cieb2 * cieb2)
+    xDL = ciel1 - ciel2
+    xDC = xC1 - xC2
+    xDA = ciea1 - ciea2
+    xDB = cieb1 - cieb2
+    xDH = numpy.maximum(xDA * xDA + xDB * xDB - xDC * xDC, 0)
+
+    xSC = 1 + 0.045 * xC1
+    xSH = 1 + 0.015 * xC1
+
+    return numpy.sqrt((xDL / whtl) ** 2 + (xDC / (whtc * xSC)) ** 2 + xDH / (whth * xSH) ** 2)
+
 def cie_lab_2hue(a, b):
     """Color difference helper"""
     bias = 0
@@ -159,6 +324,189 @@ def color_diff_laab(c1, c2, whtl=1, whtc=1, whth=1):
 
     return math.sqrt(math.pow(xDL, 2) + math.pow(xDC, 2) + math.pow(xDH, 2) + xRT * xDC * xDH)
 
+def cie_lab_2hue_batch(a, b):
+    """Vectorized cie_lab_2hue, same branches (including the a == 0 ones)"""
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        hue = numpy.degrees(numpy.arctan(b / a))
+
+    hue = numpy.where(a < 0, hue + 180, numpy.where((a > 0) & (b < 0), hue + 360, hue))
+    hue = numpy.where((a == 0) & (b > 0), 90, hue)
+    hue = numpy.where((a == 0) & (b < 0), 270, hue)
+    hue = numpy.where((a < 0) & (b == 0), 180, hue)
+    return numpy.where((a >= 0) & (b == 0), 0, hue)
+
+def color_diff_laab_batch(c1, c2, whtl=1, whtc=1, whth=1):
+    """
+    Vectorized color_diff_laab.
+
+    c1 and c2 are array-likes with L*ab triplets in the last axis, they're
+    broadcasted against each other, so one target vs N palette colors is
+    color_diff_laab_batch(target, colors) and N x M distances are
+    color_diff_laab_batch(a[:, None], b[None, :]).
+    Returns array of distances with the broadcasted shape.
+    """
+
+    if numpy is None:
+        raise RuntimeError('color_diff_laab_batch requires NumPy')
+
+    c1 = numpy.asarray(c1, dtype=numpy.float64)
+    c2 = numpy.asarray(c2, dtype=numpy.float64)
+
+    # same component order as color_diff_laab
+    ciea1, cieb1, ciel1 = c1[..., 0], c1[..., 1], c1[..., 2]
+    ciea2, cieb2, ciel2 = c2[..., 0], c2[..., 1], c2[..., 2]
+
+    xC1 = numpy.sqrt(ciea1 * ciea1 + cieb1 * cieb1)
+    xC2 = numpy.sqrt(ciea2 * ciea2 + cieb2 * cieb2)
+    xCX = (xC1 + xC2) / 2.0
+    xGX = 0.5 * (1 - numpy.sqrt(xCX ** 7 / (xCX ** 7 + 25.0 ** 7)))
+    xNN = (1 + xGX) * ciea1
+    xC1 = numpy.sqrt(xNN * xNN + cieb1 * cieb1)
+    xH1 = cie_lab_2hue_batch(xNN, cieb1)
+    xNN = (1 + xGX) * ciea2
+    xC2 = numpy.sqrt(xNN * xNN + cieb2 * cieb2)
+    xH2 = cie_lab_2hue_batch(xNN, cieb2)
+    xDL = ciel2 - ciel1
+    xDC = xC2 - xC1
+
+    chroma_zero = xC1 * xC2 == 0
+
+    xNN = numpy.round(xH2 - xH1, 12)
+    xDH = xH2 - xH1
+    xDH = numpy.where(xNN > 180, xDH - 360, numpy.where(xNN < -180, xDH + 360, xDH))
+    xDH = numpy.where(chroma_zero, 0, xDH)
+
+    xDH = 2 * numpy.sqrt(xC1 * xC2) * numpy.sin(numpy.radians(xDH / 2.0))
+    xLX = (ciel1 + ciel2) / 2.0
+    xCY = (xC1 + xC2) / 2.0
+
+    xHX = xH1 + xH2
+    xNN = numpy.abs(numpy.round(xH1 - xH2, 12))
+    xHX = numpy.where(xNN > 180, numpy.where(xHX < 360, xHX + 360, xHX - 360), xHX)
+    xHX = numpy.where(chroma_zero, xHX, xHX / 2)
+
+    xTX = 1 - 0.17 * numpy.cos(numpy.radians(xHX - 30)) + 0.24 \
+                * numpy.cos(numpy.radians(2 * xHX)) + 0.32 \
+                * numpy.cos(numpy.radians(3 * xHX + 6)) - 0.20 \
+                * numpy.cos(numpy.radians(4 * xHX - 63))
+
+    xPH = 30 * numpy.exp(-((xHX - 275) / 25.0) * ((xHX - 275) / 25.0))
+    xRC = 2 * numpy.sqrt(xCY ** 7 / (xCY ** 7 + 25.0 ** 7))
+    xSL = 1 + ((0.015 * ((xLX - 50) * (xLX - 50))) /
+               numpy.sqrt(20 + ((xLX - 50) * (xLX - 50))))
+    xSC = 1 + 0.045 * xCY
+    xSH = 1 + 0.015 * xCY * xTX
+    xRT = - numpy.sin(numpy.radians(2 * xPH)) * xRC
+    xDL = xDL / (whtl * xSL)
+    xDC = xDC / (whtc * xSC)
+    xDH = xDH / (whth * xSH)
+
+    return numpy.sqrt(xDL * xDL + xDC * xDC + xDH * xDH + xRT * xDC * xDH)
+
+# 1 - max|RT| / 2, RT = -sin(2 * xPH) * xRC with xPH <= 30 and xRC < 2,
+# so DC^2 + DH^2 + RT * DC * DH >= K_RT * (DC^2 + DH^2)
+K_RT = 1 - math.sqrt(3) / 2.0
+
+# guards bounds against floating point rounding
+BOUND_SLACK = 1 - 1e-9
+
+def color_diff_laab_bound(c1, distance, whtl=1, whtc=1, whth=1):
+    """
+    Lower bound of color_diff_laab(c1, c2) for any c2 such that
+    Euclidean distance (CIE76) between c1 and c2 is distance.
+
+    Bound grows with distance, so it holds for all colors at least
+    that far away too. It follows from:
+    * lightness term (3rd component in color_diff_laab) is divided
+      by xSL <= 1 + 0.015 * |xLX - 50|;
+    * chroma and hue terms form squared distance in a*b* plane
+      stretched by 1 + xGX >= 1 and are divided by xSC or xSH,
+      where |xSH| <= xSC <= 1 + 0.045 * 1.5 * (chroma mean);
+    * rotation term takes at most 1 - K_RT of them.
+    """
+
+    ciea1, cieb1, ciel1 = c1
+    chroma = math.sqrt(ciea1 * ciea1 + cieb1 * cieb1)
+
+    xSL = 1 + 0.015 * (abs(ciel1 - 50) + distance / 2.0)
+    xSC = 1 + 0.045 * 1.5 * (chroma + distance / 2.0)
+
+    return distance * BOUND_SLACK * min(
+        1.0 / (whtl * xSL),
+        math.sqrt(K_RT) / (max(whtc, whth) * xSC)
+    )
+
+def color_diff_laab_pair_bound(c1, c2, whtl=1, whtc=1, whth=1):
+    """
+    Cheap lower bound of color_diff_laab(c1, c2), same reasoning as
+    color_diff_laab_bound but xSL is computed exactly and chroma bound
+    uses chroma of both colors.
+    """
+
+    ciea1, cieb1, ciel1 = c1
+    ciea2, cieb2, ciel2 = c2
+
+    xLX = (ciel1 + ciel2) / 2.0 - 50
+    xSL = 1 + ((0.015 * xLX * xLX) / math.sqrt(20 + xLX * xLX))
+    xSC = 1 + 0.045 * 1.5 * (math.sqrt(ciea1 * ciea1 + cieb1 * cieb1) +
+                             math.sqrt(ciea2 * ciea2 + cieb2 * cieb2)) / 2.0
+
+    xDL = (ciel2 - ciel1) / (whtl * xSL)
+    xDA = ciea2 - ciea1
+    xDB = cieb2 - cieb1
+    xDAB = K_RT * (xDA * xDA + xDB * xDB) / (max(whtc, whth) * xSC) ** 2
+
+    return math.sqrt(xDL * xDL + xDAB) * BOUND_SLACK
+
+def color_diff_laab_pair_bound_batch(c1, c2, whtl=1, whtc=1, whth=1):
+    """Vectorized color_diff_laab_pair_bound, broadcasting like color_diff_laab_batch"""
+
+    c1 = numpy.asarray(c1, dtype=numpy.float64)
+    c2 = numpy.asarray(c2, dtype=numpy.float64)
+
+    ciea1, cieb1, ciel1 = c1[..., 0], c1[..., 1], c1[..., 2]
+    ciea2, cieb2, ciel2 = c2[..., 0], c2[..., 1], c2[..., 2]
+
+    xLX = (ciel1 + ciel2) / 2.0 - 50
+    xSL = 1 + ((0.015 * xLX * xLX) / numpy.sqrt(20 + xLX * xLX))
+    xSC = 1 + 0.045 * 1.5 * (numpy.sqrt(ciea1 * ciea1 + cieb1 * cieb1) +
+                             numpy.sqrt(ciea2 * ciea2 + cieb2 * cieb2)) / 2.0
+
+    xDL = (ciel2 - ciel1) / (whtl * xSL)
+    xDA = ciea2 - ciea1
+    xDB = cieb2 - cieb1
+    xDAB = K_RT * (xDA * xDA + xDB * xDB) / (max(whtc, whth) * xSC) ** 2
+
+    return numpy.sqrt(xDL * xDL + xDAB) * BOUND_SLACK
+
+def nearest_laab_batch(targets, colors, whtl=1, whtc=1, whth=1):
+    """
+    Index of the nearest (CIEDE2000) color for every target, first one on ties.
+    targets is N x 3, colors is M x 3.
+
+    Exact distance is computed only where color_diff_laab_pair_bound doesn't
+    exceed distance to the color with the lowest bound.
+    Returns (indexes, number of exact distances computed).
+    """
+
+    targets = numpy.asarray(targets, dtype=numpy.float64)
+    colors = numpy.asarray(colors, dtype=numpy.float64)
+    rows = numpy.arange(len(targets))
+    weights = (whtl, whtc, whth)
+
+    bounds = color_diff_laab_pair_bound_batch(targets[:, None], colors[None, :], *weights)
+    first = bounds.argmin(axis=1)
+    limit = color_diff_laab_batch(targets, colors[first], *weights)
+
+    row, col = numpy.nonzero(bounds <= limit[:, None])
+    diffs = numpy.empty_like(bounds)
+    diffs.fill(numpy.inf)
+    diffs[row, col] = color_diff_laab_batch(targets[row], colors[col], *weights)
+    diffs[rows, first] = limit
+
+    return diffs.argmin(axis=1), len(row) + len(rows)
+
 def rgb_to_hsl(r, g, b):
     r, g, b = r / 255.0, g / 255.0, b / 255.0
 
@@ -0,0 +1,189 @@
+#!/usr/bin/python2
+"""
+Headless colorscheme converter: fills in (or corrects) ctermfg/ctermbg
+and termfg/termbg of highlight lines from their guifg/guibg.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from cStringIO import StringIO
+from palettes import CTERM_RGB, CTERM_LAAB, TERM_RGB, TERM_LAAB
+import metrics
+import diskcache
+from color import Palette
+from highlight import rewrite_line, ambiguous_matches
+
+def make_palettes(use_lut=False, metric=metrics.CIEDE2000, disk=None):
+    """Builds CTERM and TERM palettes, disk is optional diskcache.DiskCache"""
+
+    palettes = {
+        'CTERM': Palette.precomputed(CTERM_RGB, CTERM_LAAB, metric),
+        'TERM': Palette.precomputed(TERM_RGB, TERM_LAAB, metric)
+    }
+
+    if use_lut:
+        for palette in palettes.itervalues():
+            palette.use_lut()
+
+    if disk is not None:
+        for palette in palettes.itervalues():
+            palette.use_disk_cache(disk)
+
+    return palettes
+
+def report_ambiguous(line, palettes, delta, name, lineno, log):
+    for group, gui, matches in ambiguous_matches(line, palettes, delta):
+        log.write('%s:%d: %s %s is ambiguous: %s\n' % (
+            name, lineno, group, gui,
+            ' vs '.join('%d (dE %.2f)' % match for match in matches)
+        ))
+
+def convert_stream(src, dst, palettes, overwrite=True, ambiguous=None, name='<stdin>', log=sys.stderr):
+    """
+    Rewrites lines from src to dst, returns number of lines processed.
+    When ambiguous is set, matches less than that far from the runner-up
+    are reported to log.
+    """
+
+    count = 0
+    for line in src:
+        dst.write(rewrite_line(line, palettes, overwrite))
+        count += 1
+
+        if ambiguous is not None:
+            report_ambiguous(line, palettes, ambiguous, name, count, log)
+
+    return count
+
+def convert_file(path, palettes, overwrite=True, in_place=False, out=sys.stdout,
+                 ambiguous=None, log=sys.stderr):
+    """Converts file to out or into itself (atomically) when in_place is set"""
+
+    with open(path, 'rb') as src:
+        if not in_place:
+            return convert_stream(src, out, palettes, overwrite, ambiguous, path, log)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                count = convert_stream(src, dst, palettes, overwrite, ambiguous, path, log)
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            os.rename(tmp, path)
+        except:
+            os.unlink(tmp)
+            raise
+
+    return count
+
+# per-process state of pool workers, see init_worker
+_worker = {}
+
+def init_worker(use_lut, metric, overwrite, in_place, use_disk=False, ambiguous=None):
+    """Builds palettes once per worker process"""
+
+    # every worker needs its own database connection
+    _worker['disk'] = diskcache.open_cache() if use_disk else None
+    _worker['palettes'] = make_palettes(use_lut, metric, _worker['disk'])
+    _worker['overwrite'] = overwrite
+    _worker['in_place'] = in_place
+    _worker['ambiguous'] = ambiguous
+
+def convert_job(path):
+    """Pool task: returns converted text (empty when in place), line count and report"""
+
+    out = StringIO()
+    log = StringIO()
+    count = convert_file(path, _worker['palettes'], _worker['overwrite'], _worker['in_place'], out,
+                         _worker['ambiguous'], log)
+
+    # pool gives workers no chance to clean up, so write back after every file
+    if _worker['disk'] is not None:
+        _worker['disk'].flush()
+
+    return out.getvalue(), count, log.getvalue()
+
+def convert_parallel(files, jobs, use_lut=False, metric=metrics.CIEDE2000,
+                     overwrite=True, in_place=False, out=sys.stdout, use_disk=False,
+                     ambiguous=None, log=sys.stderr):
+    """
+    Converts files with pool of worker processes. Results are written in
+    order of files (reports too), so output doesn't depend on scheduling.
+    Returns number of lines processed.
+    """
+
+    if use_lut:
+        # build missing tables once here, workers only map them read-only
+        make_palettes(True, metric)
+
+    pool = multiprocessing.Pool(jobs, init_worker, (use_lut, metric, overwrite, in_place, use_disk, ambiguous))
+    count = 0
+
+    try:
+        for text, lines, report in pool.imap(convert_job, files):
+            out.write(text)
+            log.write(report)
+            count += lines
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help='colorscheme files, standard input if none given')
+    parser.add_argument('-i', '--in-place', action='store_true',
+                        help='rewrite files instead of printing them')
+    parser.add_argument('-f', '--fill-only', action='store_true',
+                        help='only add missing attributes, keep existing ones')
+    parser.add_argument('--lut', action='store_true',
+                        help='use precomputed lookup tables (built if missing, requires NumPy)')
+    parser.add_argument('--disk-cache', action='store_true',
+                        help='reuse approximations from previous runs (see diskcache.py)')
+    parser.add_argument('-m', '--metric', choices=list(metrics.METRICS), default=metrics.CIEDE2000,
+                        help='color distance metric (default: %(default)s)')
+    parser.add_argument('-a', '--ambiguous', type=float, metavar='DELTA',
+                        help='report matches less than DELTA away from the second best one')
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                        help='convert files with N worker processes and report throughput')
+    args = parser.parse_args(argv)
+
+    overwrite = not args.fill_only
+
+    if args.jobs and args.files:
+        started = time.time()
+        count = convert_parallel(args.files, args.jobs, args.lut, args.metric,
+                                 overwrite, args.in_place, use_disk=args.disk_cache,
+                                 ambiguous=args.ambiguous)
+        elapsed = time.time() - started
+
+        sys.stderr.write('%d files, %d lines in %.2fs (%.0f lines/s)\n' % (
+            len(args.files), count, elapsed, count / elapsed if elapsed else 0
+        ))
+        return 0
+
+    disk = diskcache.open_cache() if args.disk_cache else None
+    palettes = make_palettes(args.lut, args.metric, disk)
+
+    try:
+        if not args.files:
+            convert_stream(sys.stdin, sys.stdout, palettes, overwrite, args.ambiguous)
+            return 0
+
+        for path in args.files:
+            convert_file(path, palettes, overwrite, args.in_place, ambiguous=args.ambiguous)
+    finally:
+        if disk is not None:
+            disk.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
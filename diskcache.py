@@ -0,0 +1,114 @@
+"""
+Persistent approximation cache shared between sessions.
+
+SQLite database in the user cache directory maps (palette hash, metric,
+RGB) to palette index. Entries are looked up one by one on misses of
+the in-memory cache, new results are collected in memory and written
+back in batches. Database is kept under max_entries rows by evicting
+the oldest ones. Database made by another VERSION is cleared on open.
+
+Set VIM_PICKER_DISK_CACHE=0 to disable it.
+"""
+import os
+import time
+import sqlite3
+from lut import cache_dir
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS approximations (
+    palette TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    rgb INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (palette, metric, rgb)
+);
+CREATE INDEX IF NOT EXISTS approximations_used ON approximations (used);
+'''
+
+# bump when approximation results change (algorithm, color math, schema),
+# entries of other versions are never served
+VERSION = 1
+
+class DiskCache(object):
+    MAX_ENTRIES = 500000
+
+    # pending writes that trigger flush
+    FLUSH_SIZE = 1000
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path or os.path.join(cache_dir(), 'approximations.sqlite')
+        self.max_entries = max_entries
+        # callers serialize access, but may do it from different threads (see server.py)
+        self.db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+
+        with self.db:
+            if self.db.execute('PRAGMA user_version').fetchone()[0] != VERSION:
+                self.db.execute('DROP TABLE IF EXISTS approximations')
+                self.db.execute('PRAGMA user_version = %d' % VERSION)
+            self.db.executescript(SCHEMA)
+
+        # number of rows, kept up to date by flush so that it doesn't have to count them
+        self.count = self.db.execute('SELECT COUNT(*) FROM approximations').fetchone()[0]
+        # (palette, metric, rgb) -> index of new entries
+        self.pending = {}
+
+    def get(self, palette, metric, rgb):
+        """Returns cached index or None"""
+
+        index = self.pending.get((palette, metric, rgb))
+        if index is not None:
+            return index
+
+        row = self.db.execute(
+            'SELECT idx FROM approximations WHERE palette = ? AND metric = ? AND rgb = ?',
+            (palette, metric, rgb)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, palette, metric, rgb, index):
+        """Remembers new entry, it's written on the next flush"""
+
+        self.pending[palette, metric, rgb] = index
+        if len(self.pending) >= self.FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        now = time.time()
+        with self.db:
+            # rows written meanwhile by another process are kept, they're the same
+            cursor = self.db.executemany(
+                'INSERT OR IGNORE INTO approximations VALUES (?, ?, ?, ?, ?)',
+                [key + (index, now) for key, index in self.pending.iteritems()]
+            )
+            self.count += max(cursor.rowcount, 0)
+            self.evict()
+
+        self.pending.clear()
+
+    def evict(self):
+        if self.count > self.max_entries:
+            cursor = self.db.execute(
+                'DELETE FROM approximations WHERE rowid IN '
+                '(SELECT rowid FROM approximations ORDER BY used LIMIT ?)',
+                (self.count - self.max_entries,)
+            )
+            self.count -= max(cursor.rowcount, 0)
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+def open_cache():
+    """Default cache, None if it's disabled or can't be opened"""
+
+    if os.environ.get('VIM_PICKER_DISK_CACHE') == '0':
+        return None
+
+    try:
+        return DiskCache()
+    except (sqlite3.Error, OSError):
+        return None
@@ -0,0 +1,245 @@
+#!/usr/bin/python2
+"""
+Dominant colors of an image, approximated to CTERM and TERM palettes:
+a starting point for colorscheme made after screenshot or wallpaper.
+
+Pixels are counted in a histogram of BITS per channel (in chunks, so
+big images don't need huge temporaries), average colors of its bins are
+converted to L*ab in batch and clustered with weighted k-means. Every
+cluster is represented by the bin color nearest to its center.
+Requires NumPy, reads PPM files natively and anything else with PIL
+if it's installed.
+"""
+import sys
+import json
+import argparse
+from colorop import numpy, rgb_to_laab_batch
+from color import Color
+from convert import make_palettes
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# pixels processed at once
+CHUNK = 1 << 20
+
+# histogram precision, bins of nearly the same colors are clustered as one point
+BITS = 6
+
+# clustering stops when no center moves more than this (L*ab units)
+EPSILON = 0.05
+
+def read_ppm(path):
+    """Reads binary (P6) or ASCII (P3) PPM as H x W x 3 uint8 array"""
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # header is 4 whitespace separated tokens, comments may be mixed in
+    tokens = []
+    pos = 0
+    while len(tokens) < 4:
+        while data[pos].isspace():
+            pos += 1
+        if data[pos] == '#':
+            pos = data.index('\n', pos)
+            continue
+
+        end = pos
+        while not data[end].isspace():
+            end += 1
+        tokens.append(data[pos:end])
+        pos = end
+
+    magic, width, height, maxval = tokens[0], int(tokens[1]), int(tokens[2]), int(tokens[3])
+
+    if magic == 'P6':
+        dtype = numpy.uint8 if maxval < 256 else numpy.dtype('>u2')
+        pixels = numpy.frombuffer(data, dtype=dtype, count=width * height * 3, offset=pos + 1)
+    elif magic == 'P3':
+        pixels = numpy.array(data[pos:].split()[:width * height * 3], dtype=numpy.uint32)
+    else:
+        raise ValueError('Unsupported image format: %s' % path)
+
+    if maxval != 255:
+        pixels = pixels.astype(numpy.uint32) * 255 / maxval
+
+    return pixels.astype(numpy.uint8).reshape(height, width, 3)
+
+def load_image(path):
+    """Returns pixels of image as H x W x 3 uint8 array"""
+
+    if numpy is None:
+        raise RuntimeError('image extraction requires NumPy')
+
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+
+    if magic in ('P6', 'P3'):
+        return read_ppm(path)
+
+    if Image is None:
+        raise RuntimeError('%s: only PPM images are supported without PIL' % path)
+
+    return numpy.asarray(Image.open(path).convert('RGB'), dtype=numpy.uint8)
+
+def from_buffer(data, width, height, rowstride, channels=3):
+    """Pixels of raw RGB(A) buffer (like gtk.gdk.Pixbuf.get_pixels()) as H x W x 3 array"""
+
+    pixels = numpy.frombuffer(data, dtype=numpy.uint8, count=rowstride * (height - 1) + width * channels)
+    return numpy.lib.stride_tricks.as_strided(pixels, (height, width, 3), (rowstride, channels, 1))
+
+def histogram(pixels, bits=BITS):
+    """
+    Returns average colors (N x 3 float array) of non-empty histogram
+    bins of pixels and numbers of pixels in them.
+    """
+
+    pixels = pixels.reshape(-1, 3)
+    size = 1 << (3 * bits)
+    shift = 8 - bits
+    counts = numpy.zeros(size)
+    sums = numpy.zeros((size, 3))
+
+    for start in xrange(0, len(pixels), CHUNK):
+        chunk = pixels[start:start + CHUNK].astype(numpy.intp)
+        bins = ((chunk[:, 0] >> shift) << (2 * bits)) | ((chunk[:, 1] >> shift) << bits) | (chunk[:, 2] >> shift)
+        counts += numpy.bincount(bins, minlength=size)
+        for axis in xrange(3):
+            sums[:, axis] += numpy.bincount(bins, weights=chunk[:, axis], minlength=size)
+
+    used = numpy.flatnonzero(counts)
+    return sums[used] / counts[used][:, None], counts[used]
+
+def assign(points, centers):
+    """Index of the nearest center for every point, computed in chunks"""
+
+    result = numpy.empty(len(points), dtype=numpy.intp)
+    step = max(1, CHUNK / len(centers))
+
+    for start in xrange(0, len(points), step):
+        chunk = points[start:start + step]
+        distances = ((chunk[:, None, :] - centers[None, :, :]) ** 2).sum(axis=-1)
+        result[start:start + step] = distances.argmin(axis=1)
+
+    return result
+
+def kmeans(points, weights, k, iterations=30, seed=1):
+    """
+    Weighted k-means (k-means++ initialization), returns centers and
+    index of cluster of every point. Fewer than k distinct points give
+    fewer clusters.
+    """
+
+    rnd = numpy.random.RandomState(seed)
+    k = min(k, len(points))
+    probabilities = weights / weights.sum()
+
+    centers = [points[rnd.choice(len(points), p=probabilities)]]
+    nearest = ((points - centers[0]) ** 2).sum(axis=1)
+
+    while len(centers) < k:
+        share = nearest * weights
+        if not share.sum():
+            break
+        centers.append(points[rnd.choice(len(points), p=share / share.sum())])
+        nearest = numpy.minimum(nearest, ((points - centers[-1]) ** 2).sum(axis=1))
+
+    centers = numpy.array(centers)
+
+    for _ in xrange(iterations):
+        labels = assign(points, centers)
+        totals = numpy.bincount(labels, weights=weights, minlength=len(centers))
+
+        moved = centers.copy()
+        for axis in xrange(3):
+            sums = numpy.bincount(labels, weights=weights * points[:, axis], minlength=len(centers))
+            moved[:, axis] = numpy.where(totals > 0, sums / numpy.maximum(totals, 1e-12), centers[:, axis])
+
+        shift = numpy.sqrt(((moved - centers) ** 2).sum(axis=1)).max()
+        centers = moved
+        if shift < EPSILON:
+            break
+
+    return centers, assign(points, centers)
+
+def dominant_colors(pixels, k=16, seed=1):
+    """
+    Returns [(Color, share of pixels), ...] of k dominant colors of
+    H x W x 3 pixel array, the most common first.
+    """
+
+    rgb, counts = histogram(pixels)
+    rgb = numpy.rint(rgb).astype(numpy.intp)
+    laab = rgb_to_laab_batch(rgb)
+
+    centers, labels = kmeans(laab, counts, k, seed=seed)
+    total = counts.sum()
+    result = []
+
+    for cluster in xrange(len(centers)):
+        members = numpy.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+
+        closest = members[((laab[members] - centers[cluster]) ** 2).sum(axis=1).argmin()]
+        result.append((Color(tuple(int(c) for c in rgb[closest])), counts[members].sum() / total))
+
+    result.sort(key=lambda item: -item[1])
+    return result
+
+def extract(pixels, palettes, k=16, seed=1):
+    """
+    Dominant colors with their palette approximations:
+    [(Color, share, {group: index}), ...]
+    """
+
+    colors = dominant_colors(pixels, k, seed)
+    indexes = dict(
+        (group, palette.approximate_many([color for color, share in colors]))
+        for group, palette in palettes.iteritems()
+    )
+
+    return [
+        (color, share, dict((group, indexes[group][i]) for group in palettes))
+        for i, (color, share) in enumerate(colors)
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image', help='image file (PPM, or any format PIL reads)')
+    parser.add_argument('-k', '--colors', type=int, default=16,
+                        help='number of colors to extract (default: %(default)s)')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='random seed (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of highlight lines')
+    args = parser.parse_args(argv)
+
+    try:
+        pixels = load_image(args.image)
+    except (RuntimeError, ValueError, IOError) as e:
+        sys.stderr.write('%s\n' % e)
+        return 1
+
+    result = extract(pixels, make_palettes(), args.colors, args.seed)
+
+    if args.json:
+        json.dump([
+            {'color': str(color), 'share': share, 'cterm': indexes['CTERM'], 'term': indexes['TERM']}
+            for color, share, indexes in result
+        ], sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return 0
+
+    sys.stdout.write('" dominant colors of %s\n' % args.image)
+    for number, (color, share, indexes) in enumerate(result, 1):
+        sys.stdout.write('hi Extracted%d guifg=%s ctermfg=%d termfg=%d " %.1f%%\n' % (
+            number, color, indexes['CTERM'], indexes['TERM'], share * 100
+        ))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/python2
+"""
+Regenerates precomputed packed RGB and L*ab data of built-in palettes
+and CTERM to TERM index mapping (CIEDE2000) in palettes.py, so startup
+and drag and drop don't have to do any color math.
+
+With --check only verifies that stored data and its checksum
+match what colorop computes (exits with 1 if they don't).
+"""
+import os
+import re
+import sys
+import hashlib
+import argparse
+import palettes
+from colorop import rgb_to_xyz, xyz_to_laab
+from color import Color, Palette
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'palettes.py')
+
+BEGIN = '# BEGIN GENERATED by genpalettes.py, do not edit\n'
+END = '# END GENERATED\n'
+
+def compute(colors):
+    """Returns packed RGB values and L*ab triplets for hex colors"""
+
+    rgbs = tuple(int(color[1:], 16) for color in colors)
+    laabs = tuple(
+        xyz_to_laab(*rgb_to_xyz(rgb >> 16, (rgb >> 8) & 0xff, rgb & 0xff))
+        for rgb in rgbs
+    )
+
+    return rgbs, laabs
+
+def compute_mapping(rgbs, laabs, size):
+    """Index of the nearest TERM color for every CTERM one (reference scan)"""
+
+    term = Palette.precomputed(rgbs[:size], laabs[:size])
+    return tuple(term.approximate_scan(Color.precomputed(rgb, laab))[0]
+                 for rgb, laab in zip(rgbs, laabs))
+
+def checksum(rgbs, laabs):
+    return hashlib.sha1(repr((rgbs, laabs))).hexdigest()
+
+def render(rgbs, laabs):
+    lines = [BEGIN, '# TERM_* are the first %d entries of CTERM_*\n' % len(palettes.TERM_COLORS)]
+
+    lines.append('CTERM_RGB = (\n')
+    for start in xrange(0, len(rgbs), 8):
+        lines.append('    %s,\n' % ', '.join('0x%06x' % rgb for rgb in rgbs[start:start + 8]))
+    lines.append(')\n\n')
+
+    lines.append('CTERM_LAAB = (\n')
+    for laab in laabs:
+        lines.append('    (%r, %r, %r),\n' % laab)
+    lines.append(')\n\n')
+
+    lines.append("CTERM_CHECKSUM = '%s'\n\n" % checksum(rgbs, laabs))
+    lines.append('TERM_RGB = CTERM_RGB[:%d]\n' % len(palettes.TERM_COLORS))
+    lines.append('TERM_LAAB = CTERM_LAAB[:%d]\n\n' % len(palettes.TERM_COLORS))
+
+    mapping = compute_mapping(rgbs, laabs, len(palettes.TERM_COLORS))
+    lines.append('# index of the nearest TERM color for every CTERM one\n')
+    lines.append('CTERM_TO_TERM = (\n')
+    for start in xrange(0, len(mapping), 16):
+        lines.append('    %s,\n' % ', '.join('%d' % index for index in mapping[start:start + 16]))
+    lines.append(')\n')
+    lines.append(END)
+
+    return ''.join(lines)
+
+def problems():
+    """Returns list of differences between stored data and what colorop computes"""
+
+    rgbs, laabs = compute(palettes.CTERM_COLORS)
+    errors = []
+
+    if getattr(palettes, 'CTERM_RGB', None) != rgbs:
+        errors.append('CTERM_RGB does not match CTERM_COLORS')
+    if getattr(palettes, 'CTERM_LAAB', None) != laabs:
+        errors.append('CTERM_LAAB does not match colorop conversion')
+    if getattr(palettes, 'CTERM_CHECKSUM', None) != checksum(rgbs, laabs):
+        errors.append('CTERM_CHECKSUM is wrong')
+    if getattr(palettes, 'CTERM_TO_TERM', None) != compute_mapping(rgbs, laabs, len(palettes.TERM_COLORS)):
+        errors.append('CTERM_TO_TERM does not match approximation')
+    if palettes.CTERM_COLORS[:len(palettes.TERM_COLORS)] != palettes.TERM_COLORS:
+        errors.append('TERM_COLORS is not a prefix of CTERM_COLORS')
+
+    return errors
+
+def check():
+    errors = problems()
+
+    for error in errors:
+        sys.stderr.write('%s\n' % error)
+
+    return not errors
+
+def generate():
+    with open(PATH) as f:
+        source = f.read()
+
+    block = render(*compute(palettes.CTERM_COLORS))
+    match = re.search(re.escape(BEGIN) + '.*?' + re.escape(END), source, re.S)
+
+    if match:
+        source = source[:match.start()] + block + source[match.end():]
+    else:
+        source = source.rstrip('\n') + '\n\n' + block
+
+    with open(PATH, 'w') as f:
+        f.write(source)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='verify instead of regenerating')
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+
+    generate()
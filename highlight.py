@@ -0,0 +1,235 @@
+"""
+Parsing and rewriting of VIM highlight (hl) lines, no GTK involved.
+"""
+import re
+from palettes import GUI_COLORS
+from color import Color
+
+NAMED_COLORS = {
+    'GUI': GUI_COLORS,
+
+    'CTERM': {
+        'black':         0,
+        'darkblue':      1,
+        'darkgreen':     2,
+        'darkcyan':      3,
+        'darkred':       4,
+        'darkmagenta':   5,
+        'brown':         6,
+        'darkyellow':    6,
+        'lightgrey':     7,
+        'lightgrey':     7,
+        'lightgray':     7,
+        'lightgray':     7,
+        'gray':          7,
+        'grey':          7,
+        'darkgray':      8,
+        'darkgrey':      8,
+        'blue':          9,
+        'lightblue':     9,
+        'green':         10,
+        'lightgreen':    10,
+        'cyan':          11,
+        'lightcyan':     11,
+        'red':           12,
+        'lightred':      12,
+        'magenta':       13,
+        'lightmagenta':  13,
+        'yellow':        14,
+        'lightyellow':   14,
+        'white':         15
+    },
+
+    'TERM': {
+        'black':         0,
+        'darkgrey':      0,
+        'darkgray':      0,
+        'darkred':       1,
+        'lightred':      1,
+        'red':           1,
+        'darkgreen':     2,
+        'lightgreen':    2,
+        'green':         2,
+        'darkyellow':    3,
+        'brown':         3,
+        'lightyellow':   3,
+        'yellow':        3,
+        'lightblue':     4,
+        'blue':          4,
+        'darkblue':      4,
+        'darkmagenta':   5,
+        'lightmagenta':  5,
+        'magenta':       5,
+        'lightcyan':     6,
+        'cyan':          6,
+        'darkcyan':      6,
+        'lightgrey':     7,
+        'gray':          7,
+        'grey':          7,
+        'white':         7,
+    }
+}
+
+MATCHERS = {
+    'GUI':      [
+                    re.compile(r'''\bguifg=(["']?)(#[\dA-Fa-f]{3,6}|\w+)\1'''),
+                    re.compile(r'''\bguibg=(["']?)(#[\dA-Fa-f]{3,6}|\w+)\1''')
+                ],
+    'CTERM':    [
+                    re.compile(r'''\bctermfg=(["']?)(\d+|\w+)\1'''),
+                    re.compile(r'''\bctermbg=(["']?)(\d+|\w+)\1''')
+                ],
+    'TERM':     [
+                    re.compile(r'''\btermfg=(["']?)(\d+|\w+)\1'''),
+                    re.compile(r'''\btermbg=(["']?)(\d+|\w+)\1''')
+                ]
+}
+
+# groups in the order attributes are written out
+GROUPS = ['GUI', 'CTERM', 'TERM']
+
+# names of attributes matched by MATCHERS, in the same order
+ATTRIBUTES = {
+    'GUI':      ['guifg', 'guibg'],
+    'CTERM':    ['ctermfg', 'ctermbg'],
+    'TERM':     ['termfg', 'termbg']
+}
+
+HIGHLIGHT = re.compile(r'^\s*(?:hl|hi(?:g(?:h(?:l(?:i(?:g(?:h(?:t)?)?)?)?)?)?)?)!?\s+(?!(?:def(?:ault)?\s+)?(?:link|clear)\b)\S')
+
+def parse_line(txt):
+    """
+    Finds colors in line, returns dictionary with group names as keys
+    and [FG, BG] lists as values. GUI colors are hex strings,
+    others are palette indexes, None stands for missing/unknown color.
+    """
+
+    result = {}
+
+    for group, matchers in MATCHERS.iteritems():
+        for matcher in matchers:
+            color = matcher.search(txt)
+
+            if color:
+                color = color.group(2)
+                if (group == 'GUI' and not color.startswith('#')) or \
+                   (group != 'GUI' and not color.isdigit()):
+                    color = NAMED_COLORS[group].get(color.lower())
+
+            if isinstance(color, str) and color.isdigit():
+                color = int(color)
+
+            result.setdefault(group, [])
+            result[group].append(color)
+
+    return result
+
+def command_end(line):
+    """
+    Position where highlight command ends: its trailing comment or | that
+    starts the next command, or end of line. Quoted font names may contain both.
+    """
+
+    quoted = False
+    for pos, char in enumerate(line):
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char in '"|':
+            return pos
+    return len(line.rstrip('\r\n'))
+
+def set_attribute(line, group, position, value):
+    """
+    Replaces attribute value in line or adds attribute if there is none
+    (at the end of command, before trailing comment or |).
+    """
+
+    attribute = '%s=%s' % (ATTRIBUTES[group][position], value)
+    match = MATCHERS[group][position].search(line)
+
+    if match:
+        return line[:match.start()] + attribute + line[match.end():]
+
+    end = command_end(line)
+    body = line[:end].rstrip()
+    rest = line[end:]
+    if rest.strip():
+        return body + ' ' + attribute + ' ' + rest
+    return body + ' ' + attribute + rest
+
+def rewrite_line(line, palettes, overwrite=True):
+    """
+    Derives terminal colors of highlight line from its GUI colors.
+    palettes maps group names ('CTERM', 'TERM') to palettes used for
+    approximation. Existing attributes are replaced only if overwrite
+    is set, otherwise just missing ones are added.
+    Returns new line (same object if nothing has changed).
+    """
+
+    if not HIGHLIGHT.match(line):
+        return line
+
+    colors = parse_line(line)
+
+    for position, gui in enumerate(colors['GUI']):
+        try:
+            gui = Color(gui) if gui else None
+        except ValueError:
+            gui = None
+
+        if gui is None:
+            continue
+
+        for group in GROUPS:
+            palette = palettes.get(group)
+            if palette is None:
+                continue
+
+            # parsed NONE is None too, only absent attributes are missing
+            if not overwrite and MATCHERS[group][position].search(line):
+                continue
+
+            index = palette.approximate(gui)[0]
+            if colors[group][position] != index:
+                line = set_attribute(line, group, position, index)
+
+    return line
+
+def ambiguous_matches(line, palettes, delta):
+    """
+    Finds GUI colors of highlight line whose best palette match is less
+    than delta away from the runner-up. Returns list of
+    (group, GUI color, [(index, diff), (index, diff)]) tuples.
+    """
+
+    if not HIGHLIGHT.match(line):
+        return []
+
+    result = []
+
+    for gui in parse_line(line)['GUI']:
+        try:
+            gui = Color(gui) if gui else None
+        except ValueError:
+            gui = None
+
+        if gui is None:
+            continue
+
+        for group in GROUPS:
+            palette = palettes.get(group)
+            if palette is None:
+                continue
+
+            best = palette.nearest(gui, 1)[0][0]
+            rgb = palette[best].rgb
+            # duplicated palette entries (like CTERM 15 and 231) aren't alternatives,
+            # runner-up is the nearest color that differs from the best one
+            same = sum(1 for color in palette if color.rgb == rgb)
+            matches = palette.nearest(gui, same + 1)
+            others = [match for match in matches if palette[match[0]].rgb != rgb]
+
+            if others and others[0][1] - matches[0][1] < delta:
+                result.append((group, gui, [matches[0], others[0]]))
+
+    return result
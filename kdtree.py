@@ -0,0 +1,73 @@
+"""
+Minimal k-d tree for nearest color search over L*ab coordinates.
+"""
+import heapq
+import math
+
+LEAF_SIZE = 8
+
+class Node(object):
+    __slots__ = ('lo', 'hi', 'items', 'left', 'right')
+
+    def __init__(self, points, items):
+        dims = range(len(points[items[0]]))
+        self.lo = [min(points[i][d] for i in items) for d in dims]
+        self.hi = [max(points[i][d] for i in items) for d in dims]
+        self.left = self.right = None
+
+        if len(items) <= LEAF_SIZE:
+            self.items = items
+            return
+
+        self.items = None
+        axis = max(dims, key=lambda d: self.hi[d] - self.lo[d])
+        items = sorted(items, key=lambda i: points[i][axis])
+        middle = len(items) // 2
+
+        self.left = Node(points, items[:middle])
+        self.right = Node(points, items[middle:])
+
+    def distance2(self, point):
+        """Squared distance from point to node's bounding box"""
+
+        result = 0
+        for value, lo, hi in zip(point, self.lo, self.hi):
+            if value < lo:
+                result += (lo - value) * (lo - value)
+            elif value > hi:
+                result += (value - hi) * (value - hi)
+
+        return result
+
+class KDTree(object):
+    def __init__(self, points):
+        self.points = [tuple(point) for point in points]
+        self.root = Node(self.points, range(len(self.points))) if self.points else None
+
+    def nearest(self, point):
+        """
+        Yields (distance, index) pairs in order of increasing Euclidean
+        distance from point, so caller can stop as soon as it has enough.
+        """
+
+        if self.root is None:
+            return
+
+        # entries are (squared distance, tie breaker, node or None, index)
+        heap = [(0, 0, self.root, None)]
+        counter = 1
+
+        while heap:
+            distance2, _, node, index = heapq.heappop(heap)
+
+            if node is None:
+                yield math.sqrt(distance2), index
+            elif node.items is not None:
+                for index in node.items:
+                    distance2 = sum((a - b) * (a - b) for a, b in zip(point, self.points[index]))
+                    heapq.heappush(heap, (distance2, counter, None, index))
+                    counter += 1
+            else:
+                for child in (node.left, node.right):
+                    heapq.heappush(heap, (child.distance2(point), counter, child, None))
+                    counter += 1
@@ -0,0 +1,120 @@
+#!/usr/bin/python2
+"""
+Precomputed 24-bit RGB -> palette index lookup tables.
+
+For a fixed palette approximation result depends only on the RGB value,
+so all 16M answers can be computed once, stored in the user cache directory
+(file name is a hash of the palette contents) and memory-mapped later on.
+Building takes a while (several minutes for 256 colors), so run this module once
+to prepare tables for built-in palettes. Requires NumPy.
+"""
+import os
+import sys
+import hashlib
+import tempfile
+import metrics
+from colorop import numpy, rgb_to_laab_batch, nearest_laab_batch
+
+SIZE = 1 << 24
+CHUNK = 1024
+
+def cache_dir():
+    """Directory for cached data, created if needed"""
+
+    path = os.environ.get('VIM_PICKER_CACHE')
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        path = os.path.join(base, 'vim-picker')
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    return path
+
+def palette_hash(palette):
+    """Hash of palette contents (colors and their order)"""
+    return hashlib.sha1(' '.join(map(str, palette))).hexdigest()
+
+def lut_path(palette, metric=metrics.CIEDE2000):
+    name = palette_hash(palette)
+    if metric != metrics.CIEDE2000:
+        name += '-' + metric
+
+    return os.path.join(cache_dir(), '%s.lut' % name)
+
+def build(palette, progress=None, metric=metrics.CIEDE2000):
+    """
+    Computes lookup table for all 24-bit colors.
+    progress(done, total) is called after every chunk if given.
+    """
+
+    if numpy is None:
+        raise RuntimeError('lookup tables require NumPy')
+
+    if not 0 < len(palette) <= 256:
+        raise ValueError('lookup tables support palettes of 1 to 256 colors')
+
+    table = numpy.empty(SIZE, dtype=numpy.uint8)
+    metric = metrics.get(metric)
+    coords = palette.coordinates(metric.name)
+    values = numpy.arange(CHUNK, dtype=numpy.uint32)
+
+    for start in xrange(0, SIZE, CHUNK):
+        rgb = values + start
+        rgb = numpy.stack((rgb >> 16, (rgb >> 8) & 0xff, rgb & 0xff), axis=-1)
+
+        if metric.name == metrics.CIEDE2000:
+            indexes = nearest_laab_batch(rgb_to_laab_batch(rgb), coords)[0]
+        else:
+            indexes = metric.diff_batch(metric.coords_batch(rgb)[:, None], coords[None, :]).argmin(axis=1)
+
+        table[start:start + CHUNK] = indexes
+
+        if progress:
+            progress(start + CHUNK, SIZE)
+
+    return table
+
+def save(table, path):
+    """Writes table atomically, so concurrent readers never see partial file"""
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            table.tofile(f)
+        os.rename(tmp, path)
+    except:
+        os.unlink(tmp)
+        raise
+
+def load(palette, create=True, progress=None, metric=metrics.CIEDE2000):
+    """
+    Returns read-only memory-mapped table for palette.
+    If there is no cached table it's built and saved when create is True,
+    otherwise None is returned.
+    """
+
+    if numpy is None:
+        raise RuntimeError('lookup tables require NumPy')
+
+    path = lut_path(palette, metric)
+
+    if not os.path.exists(path) or os.path.getsize(path) != SIZE:
+        if not create:
+            return None
+        save(build(palette, progress, metric), path)
+
+    return numpy.memmap(path, dtype=numpy.uint8, mode='r', shape=(SIZE,))
+
+if __name__ == '__main__':
+    from palettes import CTERM_RGB, CTERM_LAAB, TERM_RGB, TERM_LAAB
+    from color import Palette
+
+    def report(done, total):
+        sys.stderr.write('\r%5.1f%%' % (done * 100.0 / total))
+
+    for name, rgbs, laabs in (('TERM', TERM_RGB, TERM_LAAB), ('CTERM', CTERM_RGB, CTERM_LAAB)):
+        palette = Palette.precomputed(rgbs, laabs)
+        sys.stderr.write('%s: %s\n' % (name, lut_path(palette)))
+        load(palette, progress=report)
+        sys.stderr.write('\n')
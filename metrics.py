@@ -0,0 +1,53 @@
+"""
+Registry of color distance metrics used for palette approximation.
+
+Every metric works in some color space: it converts Color (or batch of
+8-bit RGB triplets) to coordinates and computes distances there, with
+scalar and NumPy (_batch) versions. Cheaper metrics trade accuracy for
+speed, CIEDE2000 is the exact (and default) one.
+"""
+from collections import OrderedDict
+from colorop import color_diff_laab, color_diff_laab_batch, \
+                    color_diff_cie76, color_diff_cie76_batch, \
+                    color_diff_cie94, color_diff_cie94_batch, \
+                    rgb_to_laab_batch, rgb_to_oklab, rgb_to_oklab_batch
+
+class Metric(object):
+    def __init__(self, name, title, coords, coords_batch, diff, diff_batch):
+        self.name = name
+        self.title = title
+        self.coords = coords
+        self.coords_batch = coords_batch
+        self.diff = diff
+        self.diff_batch = diff_batch
+
+    def __repr__(self):
+        return '<Metric: %s>' % self.name
+
+def _laab(color):
+    return color.laab
+
+def _oklab(color):
+    return rgb_to_oklab(color.red, color.green, color.blue)
+
+CIEDE2000 = 'ciede2000'
+
+# ordered from the cheapest to the most accurate
+METRICS = OrderedDict((metric.name, metric) for metric in [
+    Metric('cie76', 'CIE76 (fastest)', _laab, rgb_to_laab_batch,
+           color_diff_cie76, color_diff_cie76_batch),
+    Metric('oklab', 'OKLab', _oklab, rgb_to_oklab_batch,
+           color_diff_cie76, color_diff_cie76_batch),
+    Metric('cie94', 'CIE94', _laab, rgb_to_laab_batch,
+           color_diff_cie94, color_diff_cie94_batch),
+    Metric(CIEDE2000, 'CIEDE2000 (exact)', _laab, rgb_to_laab_batch,
+           color_diff_laab, color_diff_laab_batch),
+])
+
+def get(name):
+    """Returns metric by name, raises ValueError for unknown ones"""
+
+    try:
+        return METRICS[name]
+    except KeyError:
+        raise ValueError('Unknown metric: %s (known: %s)' % (name, ', '.join(METRICS)))
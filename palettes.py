@@ -1,7 +1,63 @@
 """
 Taken from http://www.calmar.ws/vim/256-xterm-24bit-rgb-color-chart.html
+GUI color names are the ones VIM understands.
+Packed RGB and L*ab data at the end is generated by genpalettes.py,
+run it after changing colors (genpalettes.py --check verifies the data).
 """
 
+GUI_COLORS = {
+    "black":        '#000000',
+    "darkgray":     '#808080',
+    "darkgrey":     '#808080',
+    "gray":         '#c0c0c0',
+    "grey":         '#c0c0c0',
+    "lightgray":    '#e0e0e0',
+    "lightgrey":    '#e0e0e0',
+    "gray10":       '#1a1a1a',
+    "grey10":       '#1a1a1a',
+    "gray20":       '#333333',
+    "grey20":       '#333333',
+    "gray30":       '#4d4d4d',
+    "grey30":       '#4d4d4d',
+    "gray40":       '#666666',
+    "grey40":       '#666666',
+    "gray50":       '#7f7f7f',
+    "grey50":       '#7f7f7f',
+    "gray60":       '#999999',
+    "grey60":       '#999999',
+    "gray70":       '#b3b3b3',
+    "grey70":       '#b3b3b3',
+    "gray80":       '#cccccc',
+    "grey80":       '#cccccc',
+    "gray90":       '#e5e5e5',
+    "grey90":       '#e5e5e5',
+    "white":        '#ffffff',
+    "darkred":      '#800000',
+    "red":          '#ff0000',
+    "lightred":     '#ffa0a0',
+    "darkblue":     '#000080',
+    "blue":         '#0000ff',
+    "lightblue":    '#a0a0ff',
+    "darkgreen":    '#008000',
+    "green":        '#00ff00',
+    "lightgreen":   '#a0ffa0',
+    "darkcyan":     '#008080',
+    "cyan":         '#00ffff',
+    "lightcyan":    '#a0ffff',
+    "darkmagenta":  '#800080',
+    "magenta":      '#ff00ff',
+    "lightmagenta": '#ffa0ff',
+    "brown":        '#804040',
+    "yellow":       '#ffff00',
+    "lightyellow":  '#ffffa0',
+    "darkyellow":   '#bbbb00',
+    "seagreen":     '#2e8b57',
+    "orange":       '#ffa500',
+    "purple":       '#a020f0',
+    "slateblue":    '#6a5acd',
+    "violet":       '#ee82ee',
+}
+
 TERM_COLORS = [
     '#000000', '#800000', '#008000', '#808000', '#000080', '#800080', '#008080', '#c0c0c0',
     '#808080', '#ff0000', '#00ff00', '#ffff00', '#0000ff', '#ff00ff', '#00ffff', '#ffffff',
@@ -49,3 +105,325 @@ CTERM_COLORS = TERM_COLORS + [
     '#808080', '#8a8a8a', '#949494', '#9e9e9e', '#a8a8a8', '#b2b2b2',
     '#bcbcbc', '#c6c6c6', '#d0d0d0', '#dadada', '#e4e4e4', '#eeeeee',
 ]
+
+# BEGIN GENERATED by genpalettes.py, do not edit
+# TERM_* are the first 16 entries of CTERM_*
+CTERM_RGB = (
+    0x000000, 0x800000, 0x008000, 0x808000, 0x000080, 0x800080, 0x008080, 0xc0c0c0,
+    0x808080, 0xff0000, 0x00ff00, 0xffff00, 0x0000ff, 0xff00ff, 0x00ffff, 0xffffff,
+    0x000000, 0x00005f, 0x000087, 0x0000af, 0x0000d7, 0x0000ff, 0x005f00, 0x005f5f,
+    0x005f87, 0x005faf, 0x005fd7, 0x005fff, 0x008700, 0x00875f, 0x008787, 0x0087af,
+    0x0087d7, 0x0087ff, 0x00af00, 0x00af5f, 0x00af87, 0x00afaf, 0x00afd7, 0x00afff,
+    0x00d700, 0x00d75f, 0x00d787, 0x00d7af, 0x00d7d7, 0x00d7ff, 0x00ff00, 0x00ff5f,
+    0x00ff87, 0x00ffaf, 0x00ffd7, 0x00ffff, 0x5f0000, 0x5f005f, 0x5f0087, 0x5f00af,
+    0x5f00d7, 0x5f00ff, 0x5f5f00, 0x5f5f5f, 0x5f5f87, 0x5f5faf, 0x5f5fd7, 0x5f5fff,
+    0x5f8700, 0x5f875f, 0x5f8787, 0x5f87af, 0x5f87d7, 0x5f87ff, 0x5faf00, 0x5faf5f,
+    0x5faf87, 0x5fafaf, 0x5fafd7, 0x5fafff, 0x5fd700, 0x5fd75f, 0x5fd787, 0x5fd7af,
+    0x5fd7d7, 0x5fd7ff, 0x5fff00, 0x5fff5f, 0x5fff87, 0x5fffaf, 0x5fffd7, 0x5fffff,
+    0x870000, 0x87005f, 0x870087, 0x8700af, 0x8700d7, 0x8700ff, 0x875f00, 0x875f5f,
+    0x875f87, 0x875faf, 0x875fd7, 0x875fff, 0x878700, 0x87875f, 0x878787, 0x8787af,
+    0x8787d7, 0x8787ff, 0x87af00, 0x87af5f, 0x87af87, 0x87afaf, 0x87afd7, 0x87afff,
+    0x87d700, 0x87d75f, 0x87d787, 0x87d7af, 0x87d7d7, 0x87d7ff, 0x87ff00, 0x87ff5f,
+    0x87ff87, 0x87ffaf, 0x87ffd7, 0x87ffff, 0xaf0000, 0xaf005f, 0xaf0087, 0xaf00af,
+    0xaf00d7, 0xaf00ff, 0xaf5f00, 0xaf5f5f, 0xaf5f87, 0xaf5faf, 0xaf5fd7, 0xaf5fff,
+    0xaf8700, 0xaf875f, 0xaf8787, 0xaf87af, 0xaf87d7, 0xaf87ff, 0xafaf00, 0xafaf5f,
+    0xafaf87, 0xafafaf, 0xafafd7, 0xafafff, 0xafd700, 0xafd75f, 0xafd787, 0xafd7af,
+    0xafd7d7, 0xafd7ff, 0xafff00, 0xafff5f, 0xafff87, 0xafffaf, 0xafffd7, 0xafffff,
+    0xd70000, 0xd7005f, 0xd70087, 0xd700af, 0xd700d7, 0xd700ff, 0xd75f00, 0xd75f5f,
+    0xd75f87, 0xd75faf, 0xd75fd7, 0xd75fff, 0xd78700, 0xd7875f, 0xd78787, 0xd787af,
+    0xd787d7, 0xd787ff, 0xd7af00, 0xd7af5f, 0xd7af87, 0xd7afaf, 0xd7afd7, 0xd7afff,
+    0xd7d700, 0xd7d75f, 0xd7d787, 0xd7d7af, 0xd7d7d7, 0xd7d7ff, 0xd7ff00, 0xd7ff5f,
+    0xd7ff87, 0xd7ffaf, 0xd7ffd7, 0xd7ffff, 0xff0000, 0xff005f, 0xff0087, 0xff00af,
+    0xff00d7, 0xff00ff, 0xff5f00, 0xff5f5f, 0xff5f87, 0xff5faf, 0xff5fd7, 0xff5fff,
+    0xff8700, 0xff875f, 0xff8787, 0xff87af, 0xff87d7, 0xff87ff, 0xffaf00, 0xffaf5f,
+    0xffaf87, 0xffafaf, 0xffafd7, 0xffafff, 0xffd700, 0xffd75f, 0xffd787, 0xffd7af,
+    0xffd7d7, 0xffd7ff, 0xffff00, 0xffff5f, 0xffff87, 0xffffaf, 0xffffd7, 0xffffff,
+    0x080808, 0x121212, 0x1c1c1c, 0x262626, 0x303030, 0x3a3a3a, 0x444444, 0x4e4e4e,
+    0x585858, 0x606060, 0x666666, 0x767676, 0x808080, 0x8a8a8a, 0x949494, 0x9e9e9e,
+    0xa8a8a8, 0xb2b2b2, 0xbcbcbc, 0xc6c6c6, 0xd0d0d0, 0xdadada, 0xe4e4e4, 0xeeeeee,
+)
+
+CTERM_LAAB = (
+    (0.0, 0.0, 0.0),
+    (25.530784572416174, 48.05523604548828, 38.05963258349509),
+    (46.22881784262658, -51.69964732808236, 49.89795230983843),
+    (51.86833136334822, -12.930760098732952, 56.677284661941485),
+    (12.975311577716514, 47.50776531013767, -64.70427324580548),
+    (29.782100092098077, 58.93983731904206, -36.49792996282386),
+    (48.25607381337552, -28.841559463342104, -8.481050086288366),
+    (77.7043635899527, 0.0042494120755520726, -0.008407692302325742),
+    (53.585013452169036, 0.003155620347972121, -0.006243566036245873),
+    (53.23288178584245, 80.10930952982204, 67.22006831026425),
+    (87.73703347354422, -86.18463649762525, 83.18116474777854),
+    (97.13824698129729, -21.555908334832285, 94.48248544644461),
+    (32.302586667249486, 79.19666178930935, -107.86368104495168),
+    (60.319933664076004, 98.25421868616114, -60.84298422386232),
+    (91.11652110946342, -48.079618466228716, -14.138127754846131),
+    (100.0, 0.00526049995830391, -0.010408184525267927),
+    (0.0, 0.0, 0.0),
+    (7.463209865572846, 38.39615107551478, -52.34607549277871),
+    (14.112275888147728, 49.37192588977779, -67.2432088225827),
+    (20.420983884976145, 59.71564965335616, -81.33107686707031),
+    (26.46612070146015, 69.62722352461212, -94.83036861180071),
+    (32.302586667249486, 79.19666178930935, -107.86368104495168),
+    (34.364043308351214, -41.84240304295839, 40.384225801720184),
+    (36.00477522400678, -23.342522005891876, -6.864021986185531),
+    (37.72315247270777, -8.273529722150341, -28.842577060678387),
+    (40.04739320273572, 8.059566547665902, -49.08309865948335),
+    (42.899612881990805, 24.243175430094354, -67.67151560413045),
+    (46.183202781207406, 39.62409795523075, -84.84161871582745),
+    (48.67061884889439, -53.728293464164466, 51.85590160704341),
+    (49.682566791784126, -41.466003695973335, 12.868357890933858),
+    (50.77742246076767, -29.973275465050907, -8.813838613418667),
+    (52.312233011298076, -16.079966733068662, -29.67377185588733),
+    (54.27466251335214, -0.9742963665541615, -49.35278055290511),
+    (56.63228517643671, 14.448951867762128, -67.83254359957134),
+    (62.219513386369314, -64.98470317203153, 62.72003364297053),
+    (62.91591397432529, -56.273735869202255, 30.55046314657592),
+    (63.679663041081014, -47.53040541408243, 9.98583082701414),
+    (64.76770538228045, -36.25286201373596, -10.660392303009282),
+    (66.18716084581571, -23.17134669805343, -30.66545481150007),
+    (67.93203760456919, -9.010726100728505, -49.79934890165521),
+    (75.20234936995341, -75.77083192940381, 73.13027367667371),
+    (75.71626667057316, -69.23789497799964, 46.41407396976871),
+    (76.28367985422663, -62.43501275667768, 27.355470312971764),
+    (77.09871786260088, -53.31338836387195, 7.409882092936826),
+    (78.17348900776794, -42.27009404553045, -12.429798922902036),
+    (79.51176606183256, -29.79435150081905, -31.750969187036993),
+    (87.73703347354422, -86.18463649762525, 83.18116474777854),
+    (88.13497351941916, -81.07972683296289, 60.7831846111238),
+    (88.57598009129902, -75.64876983435559, 43.366413237928825),
+    (89.21241413175315, -68.18921695239422, 24.404353877937336),
+    (90.0568997662806, -58.898434462230256, 5.049116167349399),
+    (91.11652110946342, -48.079618466228716, -14.138127754846131),
+    (17.61237293828507, 38.89284857553798, 27.20710155329824),
+    (21.053117056102103, 47.702151868455225, -29.539100838481293),
+    (24.264755812001724, 55.11972390810127, -50.118663420988455),
+    (28.189092810364045, 63.50835375571307, -68.19771735693645),
+    (32.56694124683556, 72.29013525018111, -84.50303504390922),
+    (37.212116388055605, 81.17002044540581, -99.54690891143059),
+    (38.928306507339684, -10.465333975481494, 45.87098579524114),
+    (40.317679695927204, 0.002553958204254414, -0.005053144847511071),
+    (41.79291090530891, 9.722218243558956, -22.19125549438159),
+    (43.81770874397761, 21.366607703160014, -42.83685726854791),
+    (46.34317307647048, 33.92102401189384, -61.923022708871734),
+    (49.29818975338513, 46.6633272055268, -79.61748877632964),
+    (51.565729568085345, -31.108961721545757, 55.36420124535143),
+    (52.49456892528866, -22.365152700370206, 17.182632117598406),
+    (53.50331899585464, -13.752260588262343, -4.465110132464911),
+    (54.92368920085666, -2.854057309089719, -25.41962303345249),
+    (56.74965090318321, 9.53176981714121, -45.271392176954265),
+    (58.95659013226495, 22.68111086377289, -63.970136180210545),
+    (64.23601249727369, -48.20564813556144, 65.17203604184402),
+    (64.89827750620623, -41.171113943951234, 33.48467399526569),
+    (65.62555339926124, -33.9612559694516, 13.008382053889168),
+    (66.66331028221734, -24.45988180833747, -7.632400275424933),
+    (68.01997868546935, -13.181903087165658, -27.68729258408169),
+    (69.69177171564061, -0.6981447380615124, -46.908189136914125),
+    (76.69946259431345, -62.88319582823365, 74.95384789293973),
+    (77.19704691480737, -57.222209781345846, 48.535418319579435),
+    (77.74673068250384, -51.269804428622166, 29.56710645609315),
+    (78.53684553143015, -43.202778499121855, 9.659006832052587),
+    (79.5796988883655, -33.31541411801042, -10.182153007006288),
+    (80.87967579624637, -22.001607724507654, -29.532597216874024),
+    (88.90021650518898, -75.9710107589821, 84.59935410082379),
+    (89.28942925786163, -71.35590681004095, 62.39133850831495),
+    (89.72087705053835, -66.42183913922884, 45.0525196728629),
+    (90.34372214655663, -59.60628980633004, 26.135735176770414),
+    (91.17054307282139, -51.05936139324091, 6.798264822003208),
+    (92.20857291822443, -41.03174436553553, -12.392021095988671),
+    (27.16041398007225, 49.940878868224516, 40.139980973266866),
+    (29.354666977810098, 55.736656195479405, -15.913383558163119),
+    (31.578547171595098, 61.25258178477916, -37.93007483074176),
+    (34.490131784655304, 68.05658591967756, -57.62314702782072),
+    (37.94488293016726, 75.66675201003781, -75.44395157414199),
+    (41.79962875231412, 83.7212934836388, -91.80240499821912),
+    (43.26419793509266, 9.135532519966016, 50.93374005998371),
+    (44.46371069270824, 16.31461187504668, 6.506584622975675),
+    (45.74983072541402, 23.37878904454338, -15.77473898188515),
+    (47.53424838937741, 32.309181331312, -36.71209007107548),
+    (49.78785417980656, 42.45498935310599, -56.19421226703467),
+    (52.459338531782265, 53.23652797503436, -74.33067800813691),
+    (54.531421641486574, -13.438151113306763, 58.90124866315472),
+    (55.38518695573529, -6.767046479044803, 21.576479795316274),
+    (56.31546474080456, 0.003279443959114392, -0.006488557767725389),
+    (57.63045335437309, 8.83158176368587, -21.029270824236445),
+    (59.32913376355367, 19.188051263860086, -41.031140818714526),
+    (61.393501741848354, 30.51918028545647, -59.930316242054275),
+    (66.37513940990512, -33.33800954489791, 67.74832209318068),
+    (67.00384520010633, -27.527521834244283, 36.579795717234774),
+    (67.69514710539465, -21.480799159648956, 16.20729298387036),
+    (68.68311002884091, -13.380642191330228, -4.417532047077999),
+    (69.97728678634078, -3.587374684624778, -24.51535230124724),
+    (71.57589825590777, 7.457199622840916, -43.81905396819423),
+    (78.31677089894741, -50.588121520952875, 76.9115591470586),
+    (78.7975663484945, -45.652608825234694, 50.816514980114036),
+    (79.32900048686676, -40.42128286150321, 31.949584979861754),
+    (80.09341645540384, -33.26716168791483, 12.086159656738404),
+    (81.10328317800739, -24.404697255260732, -7.752440583969733),
+    (82.36356635450241, -14.147238922116445, -27.130439650018),
+    (90.16992323419483, -65.77325595705241, 86.14074447521921),
+    (90.54993205251847, -61.6007503859296, 64.14041404797044),
+    (90.97129226731022, -57.12018748697123, 46.888243003207684),
+    (91.57978456959599, -50.89919655305969, 28.02276630495266),
+    (92.38792669294439, -43.04859748636969, 8.706633178660073),
+    (93.403093246032, -33.77298789204386, -10.485046965416501),
+    (36.20278758988895, 60.403801798889404, 50.584335190222475),
+    (37.73485991899391, 64.50879676543487, -2.4492776772855773),
+    (39.349152612532116, 68.66455883969367, -25.141654736436582),
+    (41.54654700441622, 74.08537642200288, -45.87666004714469),
+    (44.26196790854558, 80.47418372689341, -64.86236788958513),
+    (47.40962012615881, 87.53674739825085, -82.37008113015574),
+    (48.63381378379958, 27.334063020338917, 57.03496887925164),
+    (49.64688800037189, 32.3515260878448, 14.52935283798178),
+    (50.74290493632249, 37.49051682968868, -7.752836145340458),
+    (52.27925023742054, 44.25889102152397, -28.94182325414356),
+    (54.24349734243384, 52.29161834957924, -48.817764500010966),
+    (56.603111613591054, 61.191462242274895, -67.42406211857332),
+    (58.45414955904039, 5.0736431269789435, 63.49924621408734),
+    (59.221692999615726, 10.072221227161894, 27.34300932174274),
+    (60.06106192478134, 15.271388433311161, 5.887256499021087),
+    (61.25270608671113, 22.232047528812416, -15.18529928559882),
+    (62.800481328017014, 30.642187536328247, -35.347178472774445),
+    (64.69331478998693, 40.122220315419455, -54.47634669825001),
+    (69.30819060408969, -16.253526865907197, 71.24142447200757),
+    (69.89484935174693, -11.599249904639453, 40.79347276788299),
+    (70.54091916014389, -6.685396059066373, 20.579035570248184),
+    (71.46600176428626, 0.003966507746810954, -0.007847950741823873),
+    (72.68081892941034, 8.244924049626013, -20.148835023484146),
+    (74.18586986871782, 17.725274318636796, -39.550994784172325),
+    (80.5799882019888, -35.51659860233325, 79.63046912806475),
+    (81.03867364089834, -31.348190242078356, 53.99011825402012),
+    (81.54603546883838, -26.892578222212528, 35.27139544175151),
+    (82.27648524870123, -20.73984381615973, 15.477471608382153),
+    (83.24263770507545, -13.02790310811125, -4.350576256700078),
+    (84.45014661865515, -3.986154571870959, -23.760304183429316),
+    (91.96856239828213, -52.704506000430804, 88.31259925574297),
+    (92.33607995933752, -49.0387022531914, 66.60679609202758),
+    (92.74373872172252, -45.082524862039065, 49.48001290179811),
+    (93.33271667049438, -39.55705363527312, 30.690480211039617),
+    (94.1154282405462, -32.532730840233285, 11.407947723196488),
+    (95.09941440710887, -24.163820860515827, -7.7823582680077275),
+    (44.867380347167746, 70.4295948214852, 59.09777780823406),
+    (46.00626636874901, 73.50373842983954, 10.518260904736088),
+    (47.23103746459717, 76.7222429248764, -12.362377385064205),
+    (48.93609368653473, 81.06817853791881, -33.697111952718764),
+    (51.09809429530161, 86.38203040549031, -53.491245296795654),
+    (53.671966827897705, 92.4645357855235, -71.89505574533652),
+    (54.69071546187105, 43.555852160235055, 63.735017286298515),
+    (55.54070567575792, 47.203522251534736, 23.487573171446275),
+    (56.4670205047654, 51.03861016261685, 1.3353508781159817),
+    (57.776660178804846, 56.23637987494811, -20.012700901611357),
+    (59.468839274778745, 62.609795944069845, -40.21820234739009),
+    (61.52587281672538, 69.91169518485945, -59.25565489089033),
+    (63.156502084822094, 22.862688771901674, 68.90327575259323),
+    (63.83672350590268, 26.638461871136332, 34.180341854661236),
+    (64.58320053028295, 30.638537702888268, 12.932756080685692),
+    (65.64745522087433, 36.105644445025895, -8.14476366731367),
+    (67.0372496972765, 42.873760968470506, -28.445959349181415),
+    (68.74765706248354, 50.70293012466126, -47.80193050661084),
+    (72.96230476817564, 1.4299969463178464, 75.53381798269932),
+    (73.50219465619382, 5.120798630789791, 45.99290995266292),
+    (74.09775010603485, 9.064861386949785, 25.99881602578087),
+    (74.95226043481352, 14.509410455509242, 5.483401119999165),
+    (76.07743226629184, 21.330838667166397, -14.687667114154369),
+    (77.47597040381237, 29.32485686615821, -34.189598009811206),
+    (83.46760171162833, -18.951279182679137, 83.06604072330408),
+    (83.90021455541728, -15.49319566723889, 58.00784128386589),
+    (84.37913460838776, -11.767993613597872, 39.488199857114246),
+    (85.06935521133605, -6.576565223130215, 19.794184126492343),
+    (85.98356529650185, 0.004624866732694244, -0.009150549708225597),
+    (87.1281161301254, 7.820038788364347, -19.448324651590653),
+    (94.29827044657246, -37.671179574809976, 91.10604258728583),
+    (94.65050069224718, -34.5142073806064, 69.78176109460095),
+    (95.04137415839446, -31.090145502927825, 52.82170029539528),
+    (95.60641513417639, -26.279215649265165, 34.13598660466024),
+    (96.35787920531725, -20.116941662889964, 14.902651957775515),
+    (97.30347052876165, -12.710732788003332, -4.280233687449542),
+    (53.23288178584245, 80.10930952982204, 67.22006831026425),
+    (54.11836962860744, 82.50955242023278, 22.901120723161405),
+    (55.081884659610026, 85.07248208353651, 0.1540607464483923),
+    (56.44163293576068, 88.60951129058864, -21.46702622111154),
+    (58.194562114199925, 93.04430668611529, -41.78354646974567),
+    (60.319933664076004, 98.25421868616114, -60.84298422386232),
+    (61.171862244892594, 58.01715893950826, 70.73587465053046),
+    (61.88703952222191, 60.77997478702285, 32.93303580072573),
+    (62.67079922393772, 63.73469778774671, 11.047977319546675),
+    (63.786343556261, 67.81820930119497, -10.346824268890664),
+    (65.23999995057903, 72.94367894511583, -30.788391719323904),
+    (67.02449719578117, 78.96632458216679, -50.181396758530305),
+    (68.4517284934361, 39.35267068190412, 74.86638908004319),
+    (69.05022137972547, 42.26312853206837, 41.77318616354242),
+    (69.70903945391393, 45.38752603564217, 20.823497506147515),
+    (70.65187455296187, 49.72406819519859, -0.1963949320973546),
+    (71.88914638225855, 55.19454960386888, -20.59340586774452),
+    (73.42074045395871, 61.6563173790286, -40.146863894958294),
+    (77.23294339026582, 18.71764619184707, 80.47385376137865),
+    (77.72489438025488, 21.6550706214092, 51.99756364931145),
+    (78.2684575211792, 24.824181333013286, 32.290523057843366),
+    (79.049958379961, 29.248646428583104, 11.889841175146021),
+    (80.08176345538409, 34.8704572178396, -8.285726766964952),
+    (81.36845816641664, 41.56458117432732, -27.874514014821482),
+    (86.9285847161576, -1.9242149651027551, 87.1371576065337),
+    (87.33276389077383, 0.9262455451150564, 62.77685846659904),
+    (87.7806001671221, 4.017403648028828, 44.509230618093085),
+    (88.42673655304174, 8.359763350242522, 24.950493060869295),
+    (89.28382256784302, 13.920425627683086, 5.192429855072844),
+    (90.35882703406786, 20.601511299185805, -14.266662410653929),
+    (97.13824698129729, -21.555908334832285, 94.48248544644461),
+    (97.47309412328698, -18.8680790728189, 73.62235533978254),
+    (97.84485897887241, -15.939487356036953, 56.87154831291434),
+    (98.38260972244429, -11.801803870766015, 38.32026855544824),
+    (99.09837824069064, -6.4640224847866135, 19.155187252568574),
+    (100.0, 0.00526049995830391, -0.010408184525267927),
+    (2.193387968190372, 0.0002984078976697724, -0.0005904407270940215),
+    (5.463862478882593, 0.0007433521744260041, -0.001470823667115706),
+    (10.268184311230112, 0.001191239504094721, -0.002356931978070298),
+    (15.159720130188944, 0.0014130664348910305, -0.0027958285937157434),
+    (19.865533514532174, 0.001626471013455033, -0.003218061128607008),
+    (24.42131990585814, 0.0018330719972481369, -0.0036268323822086224),
+    (28.851902398399993, 0.002033995092215468, -0.004024369624777702),
+    (33.175472110499854, 0.002230065249880786, -0.0044123050676248),
+    (37.405890371792296, 0.002421911069583338, -0.004791882428689664),
+    (40.73054802899536, 0.002572681427087664, -0.005090189759549002),
+    (43.19228956298485, 0.002684319282575398, -0.00531107131247488),
+    (49.6370143727509, 0.0029765819945515304, -0.0058893289420769435),
+    (53.585013452169036, 0.003155620347972121, -0.006243566036245873),
+    (57.47775638823383, 0.003332152882895567, -0.006592845232700206),
+    (61.31958267014487, 0.003506376391460009, -0.006937555895270009),
+    (65.1142450374671, 0.003678461057199378, -0.007278034741187156),
+    (68.86501825007808, 0.003848555387653274, -0.007614575600767282),
+    (72.574782831502, 0.004016790011995841, -0.007947436931021734),
+    (76.24609054741438, 0.004183280650660315, -0.008276847690980027),
+    (79.88121630968035, 0.004348130469011835, -0.008603011998808974),
+    (83.48219982731817, 0.004511431965892321, -0.008926112868845593),
+    (87.05087940008394, 0.004673268506782957, -0.009246315243904846),
+    (90.58891961148048, 0.004833715579077857, -0.009563768479914359),
+    (94.09783422885042, 0.004992841830753214, -0.009878608400759603),
+)
+
+CTERM_CHECKSUM = '3acfdad9243e8213ce6859727f57addb2d2e73b4'
+
+TERM_RGB = CTERM_RGB[:16]
+TERM_LAAB = CTERM_LAAB[:16]
+
+# index of the nearest TERM color for every CTERM one
+CTERM_TO_TERM = (
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    0, 4, 4, 4, 12, 12, 2, 6, 6, 8, 5, 13, 2, 6, 6, 6,
+    6, 8, 2, 2, 6, 6, 14, 14, 10, 2, 2, 6, 14, 14, 10, 2,
+    2, 6, 14, 14, 1, 5, 5, 4, 12, 12, 3, 8, 8, 5, 13, 13,
+    3, 8, 8, 8, 8, 5, 3, 2, 6, 6, 14, 14, 10, 2, 2, 6,
+    14, 14, 10, 2, 2, 2, 14, 14, 1, 5, 5, 13, 13, 12, 3, 8,
+    8, 5, 13, 13, 3, 8, 8, 8, 8, 13, 3, 2, 7, 7, 7, 7,
+    10, 2, 2, 7, 14, 14, 10, 10, 2, 2, 14, 14, 1, 5, 5, 5,
+    13, 13, 3, 8, 8, 5, 13, 13, 3, 8, 8, 8, 8, 13, 3, 3,
+    7, 7, 7, 7, 11, 3, 2, 7, 7, 7, 11, 3, 3, 2, 15, 14,
+    9, 1, 5, 5, 13, 13, 9, 1, 5, 5, 5, 13, 3, 1, 8, 8,
+    5, 13, 11, 3, 7, 7, 7, 7, 11, 3, 3, 7, 7, 7, 11, 3,
+    3, 3, 15, 15, 9, 1, 5, 5, 13, 13, 9, 1, 1, 5, 5, 13,
+    9, 1, 8, 8, 5, 13, 11, 3, 7, 7, 7, 7, 11, 3, 3, 15,
+    15, 15, 11, 11, 3, 3, 15, 15, 0, 0, 0, 0, 8, 8, 8, 8,
+    8, 8, 8, 8, 8, 8, 8, 7, 7, 7, 7, 7, 7, 7, 15, 15,
+)
+# END GENERATED
@@ -3,10 +3,40 @@ Implementation of own ColorButton and ColorSelectionDialog
 for working with palette (approximation, indexing, etc...)
 """
 import gtk
+import json
 import gobject
-from math import ceil
+from math import ceil, pi
 from color import Color
 from colorop import opposite_rgb
+from throttle import Throttle, Debounce
+from stats import timed
+
+def to_gdk(color):
+    """Converts Color to gtk.gdk.Color"""
+    return gtk.gdk.Color(color.red * 257, color.green * 257, color.blue * 257)
+
+def from_gdk(color):
+    """Converts gtk.gdk.Color to Color"""
+    return Color((color.red >> 8, color.green >> 8, color.blue >> 8))
+
+def resolve(palette, color=None, index=None):
+    """
+    Returns (index, color) for given color or index in palette.
+    Without palette index is None and color is taken as is.
+    """
+
+    if palette and index is not None:
+        return index, palette[index]
+
+    if color is not None and not isinstance(color, Color):
+        color = Color(color)
+
+    if palette:
+        if color is not None:
+            return palette.approximate(color)
+        return 0, palette[0]
+
+    return None, color or Color('#000000')
 
 class PaletteButton(gtk.Button):
 
@@ -19,6 +49,7 @@ class PaletteButton(gtk.Button):
         self.set_border_width(2)
         self.connect('expose-event', self.expose)
 
+    @timed('PaletteButton.expose')
     def expose(self, widget, evt):
         if self.active:
             cr = self.window.cairo_create()
@@ -40,14 +71,153 @@ class PaletteButton(gtk.Button):
 
     def set_color(self, color):
         self.complement = opposite_rgb(
-            255 - color.red / 256,
-            255 - color.green / 256,
-            255 - color.blue / 256
+            255 - color.red,
+            255 - color.green,
+            255 - color.blue
         )
 
+        color = to_gdk(color)
         for state in [gtk.STATE_NORMAL, gtk.STATE_ACTIVE, gtk.STATE_PRELIGHT, gtk.STATE_SELECTED, gtk.STATE_INSENSITIVE]:
             self.modify_bg(state, color)
 
+class PaletteGrid(gtk.DrawingArea):
+    """
+    Whole palette painted as grid of swatches in a single widget,
+    clicks are translated to palette indexes. Near-duplicates of the
+    active color are marked with a dot.
+    """
+
+    __gsignals__ = {
+        'color-clicked': (gobject.SIGNAL_RUN_LAST, None, (int,))
+    }
+
+    CELL = 20
+    BORDER = 2
+
+    # bigger palettes don't get near-duplicates marked (distance matrix is N x N)
+    DUPLICATES_LIMIT = 1024
+
+    # similar colors listed in cell tooltip
+    SIMILAR = 3
+
+    def __init__(self, palette, cols=16):
+        gtk.DrawingArea.__init__(self)
+        self.palette = palette
+        self.cols = cols
+        self.rows = int(ceil(len(palette) / float(cols)))
+        self.active = None
+        self.duplicates = set()
+
+        self.set_size_request(cols * self.CELL, self.rows * self.CELL)
+        self.add_events(gtk.gdk.BUTTON_PRESS_MASK)
+        self.connect('expose-event', self.expose)
+        self.connect('button-press-event', self.on_press)
+        self.set_has_tooltip(True)
+        self.connect('query-tooltip', self.on_tooltip)
+
+    def cell_size(self):
+        return (self.allocation.width / float(self.cols),
+                self.allocation.height / float(self.rows))
+
+    def cell_rect(self, index):
+        """Cell area in widget coordinates"""
+
+        w, h = self.cell_size()
+        row, col = divmod(index, self.cols)
+        return col * w, row * h, w, h
+
+    def index_at(self, x, y):
+        w, h = self.cell_size()
+        col, row = int(x / w), int(y / h)
+
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            index = row * self.cols + col
+            if index < len(self.palette):
+                return index
+
+        return None
+
+    @timed('PaletteGrid.expose')
+    def expose(self, widget, evt):
+        cr = self.window.cairo_create()
+        area = evt.area
+        cr.rectangle(area.x, area.y, area.width, area.height)
+        cr.clip()
+
+        # paint only cells touched by exposed area
+        w, h = self.cell_size()
+        cols = xrange(max(0, int(area.x / w)), min(self.cols, int((area.x + area.width) / w) + 1))
+        rows = xrange(max(0, int(area.y / h)), min(self.rows, int((area.y + area.height) / h) + 1))
+
+        for row in rows:
+            for col in cols:
+                index = row * self.cols + col
+                if index < len(self.palette):
+                    self.draw_cell(cr, index)
+
+        return False
+
+    def draw_cell(self, cr, index):
+        color = self.palette[index]
+        x, y, w, h = self.cell_rect(index)
+
+        cr.set_source_rgb(color.red / 255.0, color.green / 255.0, color.blue / 255.0)
+        cr.rectangle(x + self.BORDER, y + self.BORDER, w - 2 * self.BORDER, h - 2 * self.BORDER)
+        cr.fill()
+
+        if index == self.active or index in self.duplicates:
+            complement = opposite_rgb(255 - color.red, 255 - color.green, 255 - color.blue)
+            cr.set_source_rgb(*[c / 255.0 for c in complement])
+
+        if index == self.active:
+            cr.set_line_width(3)
+            cr.rectangle(x + 1.5, y + 1.5, w - 3, h - 3)
+            cr.stroke()
+        elif index in self.duplicates:
+            cr.arc(x + w / 2, y + h / 2, min(w, h) / 6, 0, 2 * pi)
+            cr.fill()
+
+    def queue_draw_cell(self, index):
+        x, y, w, h = self.cell_rect(index)
+        self.queue_draw_area(int(x), int(y), int(ceil(w)) + 1, int(ceil(h)) + 1)
+
+    def set_active(self, index):
+        """Moves selection mark, only previous and new cells are redrawn"""
+
+        if index == self.active:
+            return
+
+        duplicates = set()
+        if index is not None and len(self.palette) <= self.DUPLICATES_LIMIT:
+            duplicates.update(self.palette.near_duplicates(index))
+
+        for cell in set([self.active, index]) | (self.duplicates ^ duplicates):
+            if cell is not None:
+                self.queue_draw_cell(cell)
+
+        self.active = index
+        self.duplicates = duplicates
+
+    def on_tooltip(self, widget, x, y, keyboard, tooltip):
+        index = self.index_at(x, y)
+        if index is None:
+            return False
+
+        text = '%d: %s' % (index, self.palette[index])
+        if len(self.palette) <= self.DUPLICATES_LIMIT:
+            text += '\nSimilar: ' + ', '.join(
+                '%d (dE %.2f)' % match for match in self.palette.similar(index, self.SIMILAR)
+            )
+
+        tooltip.set_text(text)
+        return True
+
+    def on_press(self, widget, evt):
+        index = self.index_at(evt.x, evt.y)
+        if index is not None:
+            self.emit('color-clicked', index)
+        return True
+
 class PaletteColorDialog(gtk.Dialog):
 
     __gsignals__ = {
@@ -56,6 +226,22 @@ class PaletteColorDialog(gtk.Dialog):
 
     COLS = 16
 
+    # number of runner-up matches shown under current color
+    ALTERNATIVES = 5
+
+    # alternatives are looked up once color wheel stops for this many milliseconds
+    ALTERNATIVES_DELAY = 150
+
+    # palettes at least this big are approximated in idle steps while dragging
+    ASYNC_THRESHOLD = 4096
+
+    # metric used while color wheel is dragged (None means palette's one),
+    # final color is always matched with palette's metric
+    drag_metric = None
+
+    # shared dialogs, one per palette, see shared()
+    instances = {}
+
     def __init__(self, palette, current=None, title=None, parent=None, flags=gtk.DIALOG_MODAL):
         gtk.Dialog.__init__(self,
                             title or 'Color Chooser',
@@ -67,20 +253,19 @@ class PaletteColorDialog(gtk.Dialog):
         self.set_position(gtk.WIN_POS_NONE)
 
         self.palette = palette
+        self.target = None
 
-        if current:
-            if self.palette:
-                self.index, self.color = self.palette.approximate(current)
-            else:
-                self.color = current
-                self.index = None
-        elif self.palette:
-            self.color = self.palette[0]
-            self.index = 0
-        else:
-            self.color = Color('#000000')
-            self.index = None
+        # color wheel emits color-changed on every motion event,
+        # approximation and repaint are done at most once per frame
+        self.selector_update = Throttle(self.sync_selectors)
+        # nearest() scan is too slow for every motion event, see sync_selectors
+        self.alternatives_update = Debounce(self.show_alternatives, self.ALTERNATIVES_DELAY)
+        self.selector_busy = False
 
+        # idle source of approximation running in background, see approximate_later
+        self.approximation = None
+
+        self.index, self.color = resolve(self.palette, current)
         self.new_color = self.color
         self.new_index = self.index
 
@@ -90,6 +275,60 @@ class PaletteColorDialog(gtk.Dialog):
 
         self.make_ui()
 
+    @classmethod
+    def shared(cls, palette):
+        """
+        Returns dialog shared by all buttons of palette, it's created on
+        the first call. Buttons take it over with retarget().
+        """
+
+        key = id(palette)
+        if key not in cls.instances:
+            # outlives any window it is made transient for
+            dialog = cls(palette, flags=gtk.DIALOG_MODAL)
+            dialog.connect('color-changed', dialog.target_color_changed)
+            dialog.connect('delete-event', dialog.hide_dialog)
+            # destroyed dialog is recreated by the next call
+            dialog.connect('destroy', lambda dlg: cls.instances.pop(key, None))
+            cls.instances[key] = dialog
+
+        return cls.instances[key]
+
+    def retarget(self, target):
+        """Makes dialog edit color of target button"""
+
+        self.target = target
+        self.set_title(target.title or 'Color Chooser')
+        self.load(target.color, target.index)
+
+    def load(self, color, index=None):
+        """Shows color (and palette index) as current one without emitting color-changed"""
+
+        index, color = resolve(self.palette, color, index)
+
+        self.color = self.new_color = color
+        self.index = self.new_index = index
+
+        self.selector_update.cancel()
+        self.alternatives_update.cancel()
+        self.cancel_approximation()
+        self.selector.set_previous_color(to_gdk(color))
+        self.set_selector_color(color)
+
+        if index is not None:
+            self.grid.set_active(index)
+            self.current_index.set_text(str(index))
+            self.current.set_color(color)
+            self.show_alternatives(color)
+
+    def target_color_changed(self, dlg, color, index):
+        if self.target is not None:
+            self.target.color_changed(self, color, index)
+
+    def hide_dialog(self, dlg, evt=None):
+        self.hide()
+        return True
+
     def on_visibility(self, me):
         rootwin = self.get_screen().get_root_window()
         x, y, mods = rootwin.get_pointer()
@@ -114,7 +353,7 @@ class PaletteColorDialog(gtk.Dialog):
 
             hbox = gtk.HBox()
 
-            self.current = self.make_button(self.color.gtk)
+            self.current = self.make_button(self.color)
             hbox.pack_start(self.current)
 
             self.current_index = gtk.Entry()
@@ -124,29 +363,57 @@ class PaletteColorDialog(gtk.Dialog):
             hbox.pack_start(self.current_index, False, 10)
 
             container.pack_start(hbox)
+            container.pack_start(self.make_alternatives())
         else:
             self.current = None
 
         container.show_all()
 
     def make_grid(self):
-        self.buttons = []
-
-        rows = int(ceil(len(self.palette) / float(self.COLS)))
-        grid = gtk.Table(rows, self.COLS)
-        row, col = 0, 0
-        for index, color in enumerate(self.palette):
-            btn = self.make_button(color.gtk)
-            btn.connect('clicked', self.palette_color, index)
-            grid.attach(btn, col, col + 1, row, row + 1)
-            self.buttons.append(btn)
-            col += 1
-            if col > self.COLS:
-                row += 1
-                col = 0
-
-        self.buttons[self.index].set_active(True)
-        return grid
+        self.grid = PaletteGrid(self.palette, self.COLS)
+        self.grid.connect('color-clicked', self.palette_color)
+        self.grid.set_active(self.index)
+        return self.grid
+
+    def make_alternatives(self):
+        hbox = gtk.HBox()
+
+        label = gtk.Label('Alternatives:')
+        hbox.pack_start(label, False, False, 5)
+
+        # buttons are recolored by show_alternatives, indexes are kept here
+        self.alternatives = []
+        self.alternative_indexes = []
+
+        for i in xrange(self.ALTERNATIVES):
+            btn = self.make_button(None)
+            btn.connect('clicked', self.alternative_clicked, i)
+            hbox.pack_start(btn)
+            self.alternatives.append(btn)
+
+        if self.index is not None:
+            self.show_alternatives(self.color)
+
+        return hbox
+
+    def show_alternatives(self, color, metric=None):
+        """Shows best palette matches for color with their distances"""
+
+        matches = self.palette.nearest(color, len(self.alternatives), metric)
+        self.alternative_indexes = [index for index, diff in matches]
+
+        for btn, (index, diff) in zip(self.alternatives, matches):
+            btn.set_color(self.palette[index])
+            btn.set_active(index == self.new_index)
+            btn.set_tooltip_text('%d (dE %.2f)' % (index, diff))
+            btn.set_sensitive(True)
+
+        for btn in self.alternatives[len(matches):]:
+            btn.set_sensitive(False)
+
+    def alternative_clicked(self, btn, position):
+        if position < len(self.alternative_indexes):
+            self.sync_selectors(index=self.alternative_indexes[position])
 
     def make_button(self, color):
         btn = PaletteButton(color)
@@ -171,8 +438,17 @@ class PaletteColorDialog(gtk.Dialog):
         if not valid:
             self.current_index.set_text(str(self.new_index or self.index))
 
+    def set_selector_color(self, color):
+        # color-changed caused by this call is not user's input
+        self.selector_busy = True
+        try:
+            self.selector.set_current_color(to_gdk(color))
+        finally:
+            self.selector_busy = False
+
     def selector_color(self, selector):
-        self.sync_selectors(from_selector=True)
+        if not self.selector_busy:
+            self.selector_update(None, None, False, True)
 
     def palette_color(self, btn, color_index):
         self.sync_selectors(index=color_index)
@@ -183,9 +459,10 @@ class PaletteColorDialog(gtk.Dialog):
     def set_index(self, index):
         self.sync_selectors(index=index, final=True)
 
+    @timed('PaletteColorDialog.sync_selectors')
     def sync_selectors(self, color=None, index=None, final=False, from_selector=False):
         if color is None and index is None:
-            color = Color(self.selector.get_current_color())
+            color = from_gdk(self.selector.get_current_color())
 
         if color is None and index is not None:
             color = self.palette[index]
@@ -193,54 +470,111 @@ class PaletteColorDialog(gtk.Dialog):
         if not isinstance(color, Color):
             color = Color(color)
 
+        self.cancel_approximation()
+
         if index is None and self.palette is not None:
-            index, color = self.palette.approximate(color)
+            metric = self.drag_metric if from_selector and not final else None
 
+            if not final and len(self.palette) >= self.ASYNC_THRESHOLD and self.palette.lut is None:
+                self.approximate_later(color, metric, from_selector)
+                return
+
+            index, approximated = self.palette.approximate(color, metric)
+            if from_selector and not final:
+                self.alternatives_update(color, metric)
+            else:
+                self.alternatives_update.cancel()
+                self.show_alternatives(color, metric)
+            color = approximated
+
+        self.apply_color(color, index, final, from_selector)
+
+    def approximate_later(self, color, metric, from_selector):
+        """
+        Shows raw color right away and approximates it in idle steps,
+        so big palettes don't freeze UI. Newer request cancels this one.
+        """
+
+        self.current.set_color(color)
+        steps = self.palette.approximate_steps(color, metric=metric)
+
+        def step():
+            result = next(steps)
+            if result is None:
+                return True
+
+            self.approximation = None
+            self.apply_color(result[1], result[0], False, from_selector)
+            return False
+
+        self.approximation = gobject.idle_add(step)
+
+    def cancel_approximation(self):
+        if self.approximation is not None:
+            gobject.source_remove(self.approximation)
+            self.approximation = None
+
+    def apply_color(self, color, index, final=False, from_selector=False):
         emit = self.new_color != color or final
 
         self.new_color = color
         if not from_selector:
-            self.selector.set_current_color(color.gtk)
+            self.selector_update.cancel()
+            self.set_selector_color(color)
 
         if index is not None:
-            if self.new_index:
-                self.buttons[self.new_index].set_active(False)
-            if self.index is not None:
-                self.buttons[self.index].set_active(False)
             self.new_index = index
-            self.buttons[self.new_index].set_active(True)
+            self.grid.set_active(self.new_index)
+
+            for btn, alternative in zip(self.alternatives, self.alternative_indexes):
+                btn.set_active(alternative == self.new_index)
+
             self.current_index.set_text(str(self.new_index))
-            self.current.set_color(self.new_color.gtk)
+            self.current.set_color(self.new_color)
 
         if final:
             self.color = self.new_color
             self.index = self.new_index
-            self.selector.set_previous_color(self.color.gtk)
+            self.selector.set_previous_color(to_gdk(self.color))
+
+            if self.target is not None:
+                self.target.commit(self.color, self.index)
 
         if emit:
             self.emit('color-changed', self.new_color, self.new_index)
 
     def on_response(self, dlg, rid):
+        # final sync reads the wheel itself, so pending updates aren't needed
+        self.selector_update.cancel()
+        self.alternatives_update.cancel()
+        self.cancel_approximation()
+
         if rid == gtk.RESPONSE_ACCEPT:
             self.sync_selectors(None, None, True)
 
+        if self.target is not None:
+            self.hide_dialog(self)
+
 class PaletteColorButton(PaletteButton):
 
     DD_TARGETS = [('picker-color-type-0xC0102', gtk.TARGET_SAME_APP, 0xC0102)]
 
+    # palettes of dragged buttons by hash, drag payload refers to them
+    sources = {}
+
     __gsignals__ = {
         'color-changed': (gobject.SIGNAL_RUN_LAST, None, (object, object))
     }
 
     def __init__(self, palette, color=None, title=None):
         super(PaletteColorButton, self).__init__()
-        self.dialog = PaletteColorDialog(palette, color, title, flags=gtk.DIALOG_MODAL | gtk.DIALOG_DESTROY_WITH_PARENT)
-        self.dialog.connect('color-changed', self.color_changed)
-        self.dialog.connect('delete-event', self.hide_dialog)
-        self.dialog.connect('response', self.hide_dialog)
+        # palette dialog is shared and created only when it's needed
+        self.palette = palette
+        self.title = title
+        self.index, self.color = resolve(palette, color)
         self.set_size_request(30, 20)
         self.connect('clicked', self.show_dialog)
-        self._set_btn_color(self.color.gtk)
+        self._set_btn_color(self.color)
         self.set_border_width(0)
 
         self.drag_source_set(
@@ -270,38 +604,69 @@ class PaletteColorButton(PaletteButton):
         return True
 
     def dd_get(self, me, context, selection, tt, time):
-        selection.set(selection.target, 0xC0102, str(self.color))
+        # besides color, payload tells where it came from so that drop on
+        # button of another palette can use index mapping instead of color math
+        payload = {'color': str(self.color), 'laab': self.color.laab}
+        if self.palette:
+            PaletteColorButton.sources[self.palette.hash] = self.palette
+            payload.update(palette=self.palette.hash, index=self.index)
+
+        selection.set(selection.target, 8, json.dumps(payload))
 
     def dd_received(self, me, context, x, y, sdata, info, time):
-        self.dialog.set_color(sdata.data)
-        self._set_btn_color(self.dialog.color.gtk)
+        try:
+            payload = json.loads(sdata.data)
+        except ValueError:
+            # plain color string
+            self.set_color(sdata.data)
+            return
+
+        # foreign or malformed drops are ignored
+        if not isinstance(payload, dict):
+            return
+
+        source = self.sources.get(payload.get('palette'))
+        index = payload.get('index')
+
+        if self.palette and source is not None and isinstance(index, int) and 0 <= index < len(source):
+            if source is not self.palette:
+                index = source.map_to(self.palette)[index]
+            self.set_index(index)
+            return
+
+        try:
+            rgb = Color.parse_string(str(payload['color']))
+            laab = tuple(float(c) for c in payload['laab'])
+        except (KeyError, ValueError, TypeError):
+            return
+
+        if len(laab) == 3:
+            self.set_color(Color.precomputed(rgb, laab))
 
     def _set_btn_color(self, color):
         super(PaletteColorButton, self).set_color(color)
 
-    def set_color(self, color):
-        self.dialog.set_color(color)
-        self.set_color(self.color.gtk)
+    def commit(self, color, index):
+        """Stores color chosen in dialog"""
 
-    def set_index(self, index):
-        self.dialog.set_index(index)
-        self._set_btn_color(self.color.gtk)
+        self.color = color
+        self.index = index
+        self._set_btn_color(color)
 
-    @property
-    def color(self):
-        return self.dialog.color
+    def set_color(self, color):
+        index, color = resolve(self.palette, color)
+        self.commit(color, index)
+        self.emit('color-changed', color, index)
 
-    @property
-    def index(self):
-        return self.dialog.index
+    def set_index(self, index):
+        index, color = resolve(self.palette, index=index)
+        self.commit(color, index)
+        self.emit('color-changed', color, index)
 
     def show_dialog(self, btn):
-        self.dialog.show()
-
-    def hide_dialog(self, dlg, evt):
-        self.dialog.hide()
-        self._set_btn_color(self.color.gtk)
-        return True
+        dialog = PaletteColorDialog.shared(self.palette)
+        dialog.retarget(self)
+        dialog.show()
 
     def color_changed(self, dlg, color, index):
         self.emit('color-changed', color, index)
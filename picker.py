@@ -3,144 +3,25 @@
 Main window implementation.
 """
 import gtk
-from palettes import CTERM_COLORS, TERM_COLORS
+import gobject
+import colorop
+import metrics
+import diskcache
+from palettes import CTERM_RGB, CTERM_LAAB, TERM_RGB, TERM_LAAB, CTERM_TO_TERM
 from color import Color, Palette
-from paletteui import PaletteColorButton
+from highlight import NAMED_COLORS, MATCHERS, parse_line
+from paletteui import PaletteColorButton, PaletteColorDialog
 from preview import PreviewEntry
-import re
+from throttle import Throttle
+import stats
+from stats import timed
+from statsui import StatsWindow
+from schemeview import SchemeEditor
 
 class Parser(gtk.Dialog):
 
-    NAMED_COLORS = {
-        'GUI': {
-            "black":        '#000000',
-            "darkgray":     '#808080',
-            "darkgrey":     '#808080',
-            "gray":         '#c0c0c0',
-            "grey":         '#c0c0c0',
-            "lightgray":    '#e0e0e0',
-            "lightgrey":    '#e0e0e0',
-            "gray10":       '#1a1a1a',
-            "grey10":       '#1a1a1a',
-            "gray20":       '#333333',
-            "grey20":       '#333333',
-            "gray30":       '#4d4d4d',
-            "grey30":       '#4d4d4d',
-            "gray40":       '#666666',
-            "grey40":       '#666666',
-            "gray50":       '#7f7f7f',
-            "grey50":       '#7f7f7f',
-            "gray60":       '#999999',
-            "grey60":       '#999999',
-            "gray70":       '#b3b3b3',
-            "grey70":       '#b3b3b3',
-            "gray80":       '#cccccc',
-            "grey80":       '#cccccc',
-            "gray90":       '#e5e5e5',
-            "grey90":       '#e5e5e5',
-            "white":        '#ffffff',
-            "darkred":      '#800000',
-            "red":          '#ff0000',
-            "lightred":     '#ffa0a0',
-            "darkblue":     '#000080',
-            "blue":         '#0000ff',
-            "lightblue":    '#a0a0ff',
-            "darkgreen":    '#008000',
-            "green":        '#00ff00',
-            "lightgreen":   '#a0ffa0',
-            "darkcyan":     '#008080',
-            "cyan":         '#00ffff',
-            "lightcyan":    '#a0ffff',
-            "darkmagenta":  '#800080',
-            "magenta":      '#ff00ff',
-            "lightmagenta": '#ffa0ff',
-            "brown":        '#804040',
-            "yellow":       '#ffff00',
-            "lightyellow":  '#ffffa0',
-            "darkyellow":   '#bbbb00',
-            "seagreen":     '#2e8b57',
-            "orange":       '#ffa500',
-            "purple":       '#a020f0',
-            "slateblue":    '#6a5acd',
-            "violet":       '#ee82ee',
-        },
-
-        'CTERM': {
-            'black':         0,
-            'darkblue':      1,
-            'darkgreen':     2,
-            'darkcyan':      3,
-            'darkred':       4,
-            'darkmagenta':   5,
-            'brown':         6,
-            'darkyellow':    6,
-            'lightgrey':     7,
-            'lightgrey':     7,
-            'lightgray':     7,
-            'lightgray':     7,
-            'gray':          7,
-            'grey':          7,
-            'darkgray':      8,
-            'darkgrey':      8,
-            'blue':          9,
-            'lightblue':     9,
-            'green':         10,
-            'lightgreen':    10,
-            'cyan':          11,
-            'lightcyan':     11,
-            'red':           12,
-            'lightred':      12,
-            'magenta':       13,
-            'lightmagenta':  13,
-            'yellow':        14,
-            'lightyellow':   14,
-            'white':         15
-        },
-
-        'TERM': {
-            'black':         0,
-            'darkgrey':      0,
-            'darkgray':      0,
-            'darkred':       1,
-            'lightred':      1,
-            'red':           1,
-            'darkgreen':     2,
-            'lightgreen':    2,
-            'green':         2,
-            'darkyellow':    3,
-            'brown':         3,
-            'lightyellow':   3,
-            'yellow':        3,
-            'lightblue':     4,
-            'blue':          4,
-            'darkblue':      4,
-            'darkmagenta':   5,
-            'lightmagenta':  5,
-            'magenta':       5,
-            'lightcyan':     6,
-            'cyan':          6,
-            'darkcyan':      6,
-            'lightgrey':     7,
-            'gray':          7,
-            'grey':          7,
-            'white':         7,
-        }
-    }
-
-    MATCHERS = {
-        'GUI':      [
-                        re.compile(r'''\bguifg=(["']?)(#[\dA-Fa-f]{3,6}|\w+)\1'''),
-                        re.compile(r'''\bguibg=(["']?)(#[\dA-Fa-f]{3,6}|\w+)\1''')
-                    ],
-        'CTERM':    [
-                        re.compile(r'''\bctermfg=(["']?)(\d+|\w+)\1'''),
-                        re.compile(r'''\bctermbg=(["']?)(\d+|\w+)\1''')
-                    ],
-        'TERM':     [
-                        re.compile(r'''\btermfg=(["']?)(\d+|\w+)\1'''),
-                        re.compile(r'''\btermbg=(["']?)(\d+|\w+)\1''')
-                    ]
-    }
+    NAMED_COLORS = NAMED_COLORS
+    MATCHERS = MATCHERS
 
     def __init__(self, parent):
         gtk.Dialog.__init__(self, 'Parse Line', parent, gtk.DIALOG_MODAL,
@@ -182,26 +63,12 @@ class Parser(gtk.Dialog):
         self.parse_line(self.entry.get_text())
 
     def parse_line(self, txt):
-        self.result = {}
+        self.result = parse_line(txt)
         result_text = ''
 
-        for group, matchers in self.MATCHERS.iteritems():
-            for suffix, matcher in zip(('FG', 'BG'), matchers):
-                color = matcher.search(txt)
-
-                if color:
-                    color = color.group(2)
-                    if (group == 'GUI' and not color.startswith('#')) or \
-                       (group != 'GUI' and not color.isdigit()):
-                        color = self.NAMED_COLORS[group].get(color.lower())
-
-                result_text += "%s %s = %s\n" % (group, suffix, color or '<no match>')
-
-                if isinstance(color, str) and color.isdigit():
-                    color = int(color)
-
-                self.result.setdefault(group, [])
-                self.result[group].append(color)
+        for group, colors in self.result.iteritems():
+            for suffix, color in zip(('FG', 'BG'), colors):
+                result_text += "%s %s = %s\n" % (group, suffix, '<no match>' if color is None else color)
 
         self.result_label.set_text(result_text)
 
@@ -209,8 +76,8 @@ class Picker(gtk.Window):
 
     CONTROLS = [
         ['GUI', None, 'guifg="%s" guibg="%s"', 'color'],
-        ['CTERM', Palette(CTERM_COLORS), 'ctermfg=%d ctermbg=%d', 'index'],
-        ['TERM', Palette(TERM_COLORS), 'termfg=%d termbg=%d', 'index']
+        ['CTERM', Palette.precomputed(CTERM_RGB, CTERM_LAAB), 'ctermfg=%d ctermbg=%d', 'index'],
+        ['TERM', Palette.precomputed(TERM_RGB, TERM_LAAB), 'termfg=%d termbg=%d', 'index']
     ]
 
     def __init__(self):
@@ -229,6 +96,27 @@ class Picker(gtk.Window):
         self.set_resizable(False)
         self.set_border_width(10)
 
+        # preview colors waiting for repaint, see fg_changed/bg_changed
+        self.pending = {}
+        self.refresh = Throttle(self.refresh_previews, 0)
+
+        # lookup tables are too slow to build on startup, use them only
+        # when they've been built already (see lut.py)
+        if colorop.numpy is not None:
+            for group in self.CONTROLS:
+                if group[1]:
+                    group[1].use_lut(create=False)
+
+        # CTERM to TERM drops just look up index (see PaletteColorButton.dd_received)
+        self.CONTROLS[1][1].add_mapping(self.CONTROLS[2][1], CTERM_TO_TERM)
+
+        # approximations from previous sessions
+        self.disk = diskcache.open_cache()
+        if self.disk is not None:
+            for group in self.CONTROLS:
+                if group[1]:
+                    group[1].use_disk_cache(self.disk)
+
         self.make_ui()
 
     def make_label(self, text, alignment=0, markup=False):
@@ -255,8 +143,8 @@ class Picker(gtk.Window):
             container.attach(self.make_label(bg_label), 0, 1, row + 1, row + 2, gtk.FILL, 0, 10)
 
             preview = PreviewEntry()
-            preview.set_bg_color(self.default_bg.gtk)
-            preview.set_fg_color(self.default_fg.gtk)
+            preview.set_bg_color(self.default_bg)
+            preview.set_fg_color(self.default_fg)
 
             fg_button = PaletteColorButton(group[1], self.default_fg, 'Choose %s' % fg_label)
             bg_button = PaletteColorButton(group[1], self.default_bg, 'Choose %s' % bg_label)
@@ -289,6 +177,26 @@ class Picker(gtk.Window):
         container.attach(btn, 0, 3, last_row, last_row + 1, gtk.FILL | gtk.EXPAND, gtk.FILL)
         last_row += 1
 
+        btn = gtk.Button('Edit colorscheme')
+        btn.connect('clicked', self.scheme_editor)
+        container.attach(btn, 0, 3, last_row, last_row + 1, gtk.FILL | gtk.EXPAND, gtk.FILL)
+        last_row += 1
+
+        btn = gtk.Button('Colors from image')
+        btn.connect('clicked', self.image_dialog)
+        btn.set_sensitive(colorop.numpy is not None)
+        container.attach(btn, 0, 3, last_row, last_row + 1, gtk.FILL | gtk.EXPAND, gtk.FILL)
+        last_row += 1
+
+        if stats.ENABLED:
+            btn = gtk.Button('Debug stats')
+            btn.connect('clicked', self.stats_window)
+            container.attach(btn, 0, 3, last_row, last_row + 1, gtk.FILL | gtk.EXPAND, gtk.FILL)
+            last_row += 1
+
+        container.attach(self.make_matching(), 0, 3, last_row, last_row + 1, gtk.FILL | gtk.EXPAND, gtk.FILL, 0, 5)
+        last_row += 1
+
         container.attach(
             self.make_label("<i>Hint: you can drag &amp; drop color buttons. Their colors will be approximized as needed.</i>", 0.5, True),
             0, 3,
@@ -302,24 +210,122 @@ class Picker(gtk.Window):
         self.add(container)
         self.make_result()
 
+    def make_matching(self):
+        """Controls for choosing color distance metric"""
+
+        hbox = gtk.HBox(spacing=5)
+        hbox.pack_start(self.make_label('Color matching:'), False)
+
+        combo = gtk.combo_box_new_text()
+        for metric in metrics.METRICS.itervalues():
+            combo.append_text(metric.title)
+        combo.set_active(metrics.METRICS.keys().index(metrics.CIEDE2000))
+        combo.connect('changed', self.metric_changed)
+        hbox.pack_start(combo, False)
+
+        fast = gtk.CheckButton('Fast matching (CIE76) while dragging')
+        fast.connect('toggled', self.drag_metric_changed)
+        hbox.pack_start(fast, False)
+
+        return hbox
+
+    def metric_changed(self, combo):
+        metric = metrics.METRICS.keys()[combo.get_active()]
+        for group in self.CONTROLS:
+            if group[1]:
+                group[1].metric = metric
+
+    def drag_metric_changed(self, check):
+        PaletteColorDialog.drag_metric = 'cie76' if check.get_active() else None
+
     def parse_dialog(self, btn):
         Parser(self).show()
 
+    def scheme_editor(self, btn):
+        palettes = dict((group[0], group[1]) for group in self.CONTROLS if group[1])
+        SchemeEditor(palettes).show_all()
+
+    def image_dialog(self, btn):
+        dialog = gtk.FileChooserDialog('Colors from image', self, gtk.FILE_CHOOSER_ACTION_OPEN,
+                                       (gtk.STOCK_CANCEL, gtk.RESPONSE_REJECT,
+                                        gtk.STOCK_OPEN, gtk.RESPONSE_ACCEPT))
+
+        images = gtk.FileFilter()
+        images.set_name('Images')
+        images.add_pixbuf_formats()
+        dialog.add_filter(images)
+
+        path = dialog.run() == gtk.RESPONSE_ACCEPT and dialog.get_filename()
+        dialog.destroy()
+
+        if path:
+            self.colors_from_image(path)
+
+    def colors_from_image(self, path):
+        """
+        Uses the most common color of image as BG and the most
+        different of its other dominant colors as FG.
+        """
+
+        # extract pulls in convert, multiprocessing and PIL, startup doesn't need them
+        import extract
+
+        try:
+            pixbuf = gtk.gdk.pixbuf_new_from_file(path)
+        except gobject.GError as e:
+            self.result.set_text(str(e))
+            return
+
+        self.window.set_cursor(gtk.gdk.Cursor(gtk.gdk.WATCH))
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        try:
+            pixels = extract.from_buffer(pixbuf.get_pixels(), pixbuf.get_width(), pixbuf.get_height(),
+                                         pixbuf.get_rowstride(), pixbuf.get_n_channels())
+            palettes = dict((group[0], group[1]) for group in self.CONTROLS if group[1])
+            result = extract.extract(pixels, palettes, 8)
+        finally:
+            self.window.set_cursor(None)
+
+        bg = result[0]
+        fg = max(result[1:] or result, key=lambda item: item[0] - bg[0])
+
+        colors = {'GUI': [str(fg[0]), str(bg[0])]}
+        for group in palettes:
+            colors[group] = [fg[2][group], bg[2][group]]
+
+        self.set_colors(**colors)
+
+    def stats_window(self, btn):
+        StatsWindow().show_all()
+
     def set_colors(self, **colors):
         for group in self.CONTROLS:
             if group[0] in colors:
                 for idx, color in enumerate(colors[group[0]]):
-                    if color:
+                    if color is not None:
                         getattr(group[idx + 4], 'set_%s' % group[3])(color)
 
     def fg_changed(self, btn, color, index, preview):
-        preview.set_fg_color(color.gtk)
-        self.make_result()
+        self.pending[preview, 'fg'] = color
+        self.refresh()
 
     def bg_changed(self, btn, color, index, preview):
-        preview.set_bg_color(color.gtk)
+        self.pending[preview, 'bg'] = color
+        self.refresh()
+
+    @timed('Picker.refresh_previews')
+    def refresh_previews(self):
+        """Applies all changes collected since last repaint at once"""
+
+        for (preview, which), color in self.pending.iteritems():
+            getattr(preview, 'set_%s_color' % which)(color)
+
+        self.pending.clear()
         self.make_result()
 
+    @timed('Picker.make_result')
     def make_result(self):
         text = 'hl Example ' + " ".join([
             group[2] % tuple([getattr(color, group[3]) for color in group[4:]])
@@ -333,3 +339,6 @@ if __name__ == '__main__':
     window.connect('delete-event', gtk.main_quit)
     window.show()
     gtk.main()
+
+    if window.disk is not None:
+        window.disk.close()
@@ -3,6 +3,8 @@ Slightly modified GtkEntry for previewing text.
 """
 import gtk
 import pango
+from paletteui import to_gdk
+from stats import timed
 
 class PreviewEntry(gtk.Entry):
     def __init__(self, text='Example Preview'):
@@ -27,13 +29,14 @@ class PreviewEntry(gtk.Entry):
         return self.get_colormap().alloc_color(color)
 
     def set_bg_color(self, color):
-        self.bg_color = color
+        self.bg_color = to_gdk(color)
         self.change_style()
 
     def set_fg_color(self, color):
-        self.fg_color = color
+        self.fg_color = to_gdk(color)
         self.change_style()
 
+    @timed('PreviewEntry.change_style')
     def change_style(self):
         style = gtk.RcStyle()
         style.font_desc = self.font
@@ -0,0 +1,89 @@
+"""
+Whole colorscheme as editable list of highlight groups, no GTK involved.
+"""
+import os
+import re
+import tempfile
+from highlight import HIGHLIGHT, parse_line, set_attribute, rewrite_line
+
+NAME = re.compile(r'^\s*\S+?!?\s+(?:def(?:ault)?\s+)?(\S+)')
+
+class Scheme(object):
+    """
+    Lines of colorscheme file, highlight lines are groups addressed by
+    their row number. Colors of a group are parsed when they're first
+    needed (only visible rows are asked for them).
+    """
+
+    def __init__(self, lines, path=None):
+        self.lines = list(lines)
+        self.path = path
+        self.modified = False
+        # line number of every highlight group
+        self.groups = [number for number, line in enumerate(self.lines) if HIGHLIGHT.match(line)]
+        self._colors = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.readlines(), path)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def line(self, row):
+        return self.lines[self.groups[row]]
+
+    def name(self, row):
+        match = NAME.match(self.line(row))
+        return match.group(1) if match else ''
+
+    def colors(self, row):
+        """parse_line() result of group (shared, don't modify it)"""
+
+        if row not in self._colors:
+            self._colors[row] = parse_line(self.line(row))
+        return self._colors[row]
+
+    def set_color(self, row, group, position, value):
+        """Sets group attribute (hex string for GUI, palette index for others)"""
+
+        number = self.groups[row]
+        line = set_attribute(self.lines[number], group, position, value)
+
+        if line != self.lines[number]:
+            self.lines[number] = line
+            self._colors.pop(row, None)
+            self.modified = True
+
+    def derive(self, palettes, overwrite=False):
+        """Fills terminal colors of all groups from GUI ones, returns number of changed groups"""
+
+        changed = 0
+        for row, number in enumerate(self.groups):
+            line = rewrite_line(self.lines[number], palettes, overwrite)
+            if line is not self.lines[number]:
+                self.lines[number] = line
+                self._colors.pop(row, None)
+                changed += 1
+
+        self.modified = self.modified or bool(changed)
+        return changed
+
+    def save(self, path=None):
+        """Writes scheme atomically to path (its own file by default)"""
+
+        path = path or self.path
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.writelines(self.lines)
+            if os.path.exists(path):
+                os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            os.rename(tmp, path)
+        except:
+            os.unlink(tmp)
+            raise
+
+        self.path = path
+        self.modified = False
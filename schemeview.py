@@ -0,0 +1,276 @@
+#!/usr/bin/python2
+"""
+Editor of whole colorscheme: one row per highlight group with preview
+and six color swatches. Rows are painted by gtk.TreeView only when
+visible and swatches are edited with palette dialogs shared by all rows,
+so big schemes don't create any widgets per group.
+"""
+import sys
+import gtk
+from color import Color
+from colorop import opposite_rgb
+from highlight import GROUPS
+from paletteui import PaletteColorDialog, resolve
+from scheme import Scheme
+
+# (group, position) of swatch columns
+COLUMNS = [(group, position) for group in GROUPS for position in (0, 1)]
+
+class CellTarget(object):
+    """
+    Stands for PaletteColorButton when shared dialog edits a swatch
+    (see PaletteColorDialog.retarget). Live changes are only previewed,
+    the scheme is written when the dialog is accepted.
+    """
+
+    def __init__(self, editor, row, group, position):
+        self.editor = editor
+        self.row = row
+        self.group = group
+        self.position = position
+        self.title = 'Choose %s %s of %s' % (group, 'FG' if position == 0 else 'BG',
+                                            editor.scheme.name(row))
+        self.index, self.color = editor.current(row, group, position)
+
+    def color_changed(self, dlg, color, index):
+        self.editor.set_preview(self.row, self.group, self.position, color, index)
+
+    def commit(self, color, index):
+        self.color = color
+        self.index = index
+        self.editor.update(self.row, self.group, self.position, color, index)
+
+class SchemeEditor(gtk.Window):
+    PREVIEW = 'Example Preview'
+
+    # uniform row height lets TreeView skip measuring rows
+    ROW_HEIGHT = 24
+
+    def __init__(self, palettes, scheme=None):
+        gtk.Window.__init__(self)
+        self.set_default_size(720, 560)
+
+        # GUI group has no palette
+        self.palettes = dict(palettes, GUI=None)
+
+        self.store = gtk.ListStore(int)
+        # (row, group, position, index, color) of swatch edited in dialog, not written yet
+        self.preview = None
+        # shared dialogs watched by end_preview -> their handler ids
+        self.dialogs = {}
+        self.view = self.make_view()
+
+        scroll = gtk.ScrolledWindow()
+        scroll.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+        scroll.add(self.view)
+
+        vbox = gtk.VBox(spacing=5)
+        vbox.pack_start(self.make_toolbar(), False)
+        vbox.pack_start(scroll)
+        self.add(vbox)
+
+        self.set_scheme(scheme or Scheme([]))
+        self.connect('destroy', self.on_destroy)
+
+    def make_toolbar(self):
+        hbox = gtk.HBox(spacing=5)
+
+        for stock, handler in ((gtk.STOCK_OPEN, self.open_dialog), (gtk.STOCK_SAVE, self.save)):
+            btn = gtk.Button(stock=stock)
+            btn.connect('clicked', handler)
+            hbox.pack_start(btn, False)
+
+        btn = gtk.Button('Fill terminal colors')
+        btn.set_tooltip_text('Derive missing CTERM/TERM colors from GUI ones')
+        btn.connect('clicked', self.derive)
+        hbox.pack_start(btn, False)
+
+        return hbox
+
+    def make_view(self):
+        view = gtk.TreeView(self.store)
+        view.set_fixed_height_mode(True)
+        view.set_rules_hint(True)
+
+        self.add_column(view, 'Group', self.render_name, 140)
+        self.add_column(view, 'Preview', self.render_preview, 160)
+
+        for column in COLUMNS:
+            title = '%s %s' % (column[0], 'FG' if column[1] == 0 else 'BG')
+            self.add_column(view, title, self.render_swatch, 64, column)
+
+        view.connect('button-press-event', self.on_press)
+        return view
+
+    def add_column(self, view, title, func, width, data=None):
+        renderer = gtk.CellRendererText()
+        renderer.set_fixed_size(-1, self.ROW_HEIGHT)
+
+        col = gtk.TreeViewColumn(title, renderer)
+        col.set_sizing(gtk.TREE_VIEW_COLUMN_FIXED)
+        col.set_fixed_width(width)
+        col.set_cell_data_func(renderer, func, data)
+        # swatch columns are recognized in on_press by this
+        col.swatch = data
+        view.append_column(col)
+
+    def set_scheme(self, scheme):
+        self.scheme = scheme
+        self.set_title('Colorscheme: %s' % (scheme.path or 'untitled'))
+
+        # rows only refer to scheme groups, everything else is computed while painting
+        self.view.set_model(None)
+        self.store.clear()
+        for row in xrange(len(scheme)):
+            self.store.append((row,))
+        self.view.set_model(self.store)
+
+    def current(self, row, group, position):
+        """(index, color) of swatch, missing terminal colors are approximated from GUI one"""
+
+        value = self.scheme.colors(row)[group][position]
+        palette = self.palettes[group]
+
+        try:
+            if palette is None:
+                return resolve(None, value)
+            if value is not None and 0 <= value < len(palette):
+                return resolve(palette, index=value)
+
+            gui = self.scheme.colors(row)['GUI'][position]
+            return resolve(palette, gui and Color(gui))
+        except ValueError:
+            return resolve(palette)
+
+    def render_name(self, col, renderer, model, it, data):
+        renderer.set_property('text', self.scheme.name(model.get_value(it, 0)))
+
+    def previewed(self, row, group, position):
+        """(index, color) of swatch being edited or None"""
+
+        if self.preview is not None and self.preview[:3] == (row, group, position):
+            return self.preview[3:]
+        return None
+
+    def render_preview(self, col, renderer, model, it, data):
+        row = model.get_value(it, 0)
+        colors = list(self.scheme.colors(row)['GUI'])
+
+        for position in (0, 1):
+            edited = self.previewed(row, 'GUI', position)
+            if edited is not None:
+                colors[position] = str(edited[1])
+
+        fg, bg = colors
+
+        renderer.set_property('text', self.PREVIEW)
+        renderer.set_property('foreground', fg)
+        renderer.set_property('background', bg)
+
+    def render_swatch(self, col, renderer, model, it, column):
+        row = model.get_value(it, 0)
+        group, position = column
+        value = self.scheme.colors(row)[group][position]
+        edited = self.previewed(row, group, position)
+
+        if value is None and edited is None:
+            renderer.set_property('text', '')
+            renderer.set_property('background', None)
+            return
+
+        index, color = edited or self.current(row, group, position)
+        complement = opposite_rgb(255 - color.red, 255 - color.green, 255 - color.blue)
+        renderer.set_property('text', str(color) if index is None else str(index))
+        renderer.set_property('background', str(color))
+        renderer.set_property('foreground', str(Color(tuple(complement))))
+
+    def on_press(self, view, evt):
+        if evt.button != 1:
+            return False
+
+        hit = view.get_path_at_pos(int(evt.x), int(evt.y))
+        if hit is None or getattr(hit[1], 'swatch', None) is None:
+            return False
+
+        path, col = hit[0], hit[1]
+        row = self.store[path][0]
+        group, position = col.swatch
+
+        dialog = PaletteColorDialog.shared(self.palettes[group])
+        dialog.set_transient_for(self)
+        if dialog not in self.dialogs:
+            # dialog is hidden by OK, Cancel and closing alike
+            self.dialogs[dialog] = dialog.connect('hide', self.end_preview)
+        dialog.retarget(CellTarget(self, row, group, position))
+        dialog.show()
+        return True
+
+    def repaint(self, row):
+        # only this row gets repainted
+        it = self.store.iter_nth_child(None, row)
+        self.store.row_changed(self.store.get_path(it), it)
+
+    def set_preview(self, row, group, position, color, index):
+        self.preview = (row, group, position, index, color)
+        self.repaint(row)
+
+    def end_preview(self, dialog):
+        # dialogs are shared with picker, they must not be destroyed with editor
+        dialog.set_transient_for(None)
+
+        if self.preview is not None:
+            row = self.preview[0]
+            self.preview = None
+            self.repaint(row)
+
+    def update(self, row, group, position, color, index):
+        value = str(color) if index is None else index
+        self.scheme.set_color(row, group, position, value)
+        self.repaint(row)
+
+    def on_destroy(self, me):
+        for dialog, handler in self.dialogs.iteritems():
+            dialog.disconnect(handler)
+            if dialog.get_transient_for() is self:
+                dialog.set_transient_for(None)
+        self.dialogs.clear()
+
+    def derive(self, btn):
+        palettes = dict((group, palette) for group, palette in self.palettes.iteritems() if palette)
+        if self.scheme.derive(palettes):
+            self.view.queue_draw()
+
+    def open_dialog(self, btn):
+        dialog = gtk.FileChooserDialog('Open colorscheme', self, gtk.FILE_CHOOSER_ACTION_OPEN,
+                                       (gtk.STOCK_CANCEL, gtk.RESPONSE_REJECT,
+                                        gtk.STOCK_OPEN, gtk.RESPONSE_ACCEPT))
+        path = dialog.run() == gtk.RESPONSE_ACCEPT and dialog.get_filename()
+        dialog.destroy()
+
+        if path:
+            self.set_scheme(Scheme.load(path))
+
+    def save(self, btn):
+        path = self.scheme.path
+        if path is None:
+            dialog = gtk.FileChooserDialog('Save colorscheme', self, gtk.FILE_CHOOSER_ACTION_SAVE,
+                                           (gtk.STOCK_CANCEL, gtk.RESPONSE_REJECT,
+                                            gtk.STOCK_SAVE, gtk.RESPONSE_ACCEPT))
+            dialog.set_do_overwrite_confirmation(True)
+            path = dialog.run() == gtk.RESPONSE_ACCEPT and dialog.get_filename()
+            dialog.destroy()
+
+            if not path:
+                return
+
+        self.scheme.save(path)
+        self.set_title('Colorscheme: %s' % path)
+
+if __name__ == '__main__':
+    from picker import Picker
+
+    palettes = dict((group[0], group[1]) for group in Picker.CONTROLS if group[1])
+    editor = SchemeEditor(palettes, Scheme.load(sys.argv[1]) if len(sys.argv) > 1 else None)
+    editor.connect('destroy', gtk.main_quit)
+    editor.show_all()
+    gtk.main()
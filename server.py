@@ -0,0 +1,185 @@
+#!/usr/bin/python2
+"""
+Headless approximation server for editor integration: keeps palettes
+and their caches warm and answers line-delimited JSON requests on
+standard input/output or on a Unix socket.
+
+Every request is an object with "op" and optional "id" (copied into
+response), or VIM channel message [id, object]:
+
+    {"id": 1, "op": "approximate", "palette": "CTERM", "colors": ["#ff0000"]}
+    -> {"id": 1, "result": [9]}
+
+    {"op": "parse", "lines": ["hi Normal guifg=#ffffff"]}
+    -> {"result": [{"GUI": ["#ffffff", null], "CTERM": [null, null], ...}]}
+
+    {"op": "rewrite", "lines": ["hi Normal guifg=#ffffff"], "overwrite": true}
+    -> {"result": ["hi Normal guifg=#ffffff ctermfg=15 termfg=15"]}
+
+nearest takes the same arguments as approximate plus "k" and returns
+[[index, diff], ...] of the best matches for every color. Both accept
+optional "metric", colors are anything Color takes (hex strings, GUI
+names, packed integers). Failed requests get {"error": message}
+instead of result.
+"""
+import os
+import sys
+import stat
+import json
+import argparse
+import threading
+import SocketServer
+import metrics
+import diskcache
+from color import Color
+from convert import make_palettes
+from highlight import parse_line, rewrite_line
+
+class Server(object):
+    def __init__(self, use_lut=False, metric=metrics.CIEDE2000, disk=None):
+        self.palettes = make_palettes(use_lut, metric, disk)
+        # palettes and caches aren't thread safe, socket clients are served one request at a time
+        self.lock = threading.Lock()
+
+    def palette_args(self, request):
+        palette = self.palettes.get(request.get('palette', 'CTERM'))
+        if palette is None:
+            raise ValueError('Unknown palette: %s' % request.get('palette'))
+
+        metric = request.get('metric')
+        if metric is not None:
+            metric = metrics.get(metric).name
+
+        return palette, metric
+
+    def list_arg(self, request, name, types, description):
+        value = request[name]
+        if not isinstance(value, list) or not all(isinstance(item, types) for item in value):
+            raise ValueError('%s must be a list of %s' % (name, description))
+        return value
+
+    def colors_arg(self, request):
+        colors = self.list_arg(request, 'colors', (basestring, int, long), 'strings or integers')
+        return [Color(color) for color in colors]
+
+    def op_approximate(self, request):
+        palette, metric = self.palette_args(request)
+        return [palette.approximate(color, metric)[0] for color in self.colors_arg(request)]
+
+    def op_nearest(self, request):
+        palette, metric = self.palette_args(request)
+        k = int(request.get('k', 5))
+        return [palette.nearest(color, k, metric) for color in self.colors_arg(request)]
+
+    # highlight.py works with byte strings, JSON gives unicode ones
+
+    def op_parse(self, request):
+        lines = self.list_arg(request, 'lines', basestring, 'strings')
+        return [parse_line(line.encode('utf-8')) for line in lines]
+
+    def op_rewrite(self, request):
+        lines = self.list_arg(request, 'lines', basestring, 'strings')
+        overwrite = request.get('overwrite', True)
+        return [rewrite_line(line.encode('utf-8'), self.palettes, overwrite).decode('utf-8')
+                for line in lines]
+
+    def handle(self, line):
+        """Answers one request line, returns response line"""
+
+        msgid = request = None
+
+        try:
+            request = json.loads(line)
+
+            if isinstance(request, list):
+                msgid, request = request
+
+            if not isinstance(request, dict):
+                raise ValueError('Request must be an object')
+
+            handler = getattr(self, 'op_%s' % request.get('op'), None)
+            if handler is None:
+                raise ValueError('Unknown op: %s' % request.get('op'))
+
+            with self.lock:
+                response = {'result': handler(request)}
+        except (ValueError, KeyError, TypeError) as e:
+            # messages may quote non-ASCII input, str() can't encode it
+            try:
+                response = {'error': unicode(e)}
+            except UnicodeError:
+                response = {'error': repr(e)}
+        except Exception as e:
+            # one broken request must not stop the server
+            response = {'error': repr(e)}
+
+        if msgid is not None:
+            response = [msgid, response]
+        elif isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+
+        return json.dumps(response, separators=(',', ':')) + '\n'
+
+    def serve_stream(self, src, dst):
+        for line in iter(src.readline, ''):
+            if line.strip():
+                dst.write(self.handle(line))
+                dst.flush()
+
+    def serve_socket(self, path):
+        server = self
+
+        class Handler(SocketServer.StreamRequestHandler):
+            def handle(self):
+                server.serve_stream(self.rfile, self.wfile)
+
+        # stale socket of previous run is replaced, anything else is kept
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError('%s exists and is not a socket' % path)
+            os.unlink(path)
+
+        listener = SocketServer.ThreadingUnixStreamServer(path, Handler)
+        listener.daemon_threads = True
+
+        try:
+            listener.serve_forever()
+        finally:
+            listener.server_close()
+            os.unlink(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--socket', metavar='PATH',
+                        help='listen on Unix socket instead of standard input/output')
+    parser.add_argument('--lut', action='store_true',
+                        help='use precomputed lookup tables (built if missing, requires NumPy)')
+    parser.add_argument('--disk-cache', action='store_true',
+                        help='reuse approximations from previous runs (see diskcache.py)')
+    parser.add_argument('-m', '--metric', choices=list(metrics.METRICS), default=metrics.CIEDE2000,
+                        help='default color distance metric (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    disk = diskcache.open_cache() if args.disk_cache else None
+    server = Server(args.lut, args.metric, disk)
+
+    try:
+        if args.socket:
+            server.serve_socket(args.socket)
+        else:
+            server.serve_stream(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        sys.stderr.write('%s\n' % e)
+        return 1
+    finally:
+        if disk is not None:
+            with server.lock:
+                disk.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
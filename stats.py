@@ -0,0 +1,65 @@
+"""
+Opt-in instrumentation of hot paths. Set VIM_PICKER_STATS=1 to record
+call counts and time of functions decorated with timed(), the table is
+printed to stderr on exit (and shown by picker's stats window).
+When disabled timed() returns functions untouched, so it costs nothing.
+"""
+import os
+import sys
+import time
+import atexit
+from collections import OrderedDict
+
+ENABLED = os.environ.get('VIM_PICKER_STATS', '0') not in ('', '0')
+
+# name -> [calls, total seconds, longest call seconds]
+STATS = OrderedDict()
+
+def timed(name):
+    """Decorator recording calls of function under name"""
+
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        record = STATS.setdefault(name, [0, 0.0, 0.0])
+
+        def wrapper(*args, **kwargs):
+            started = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.time() - started
+                record[0] += 1
+                record[1] += elapsed
+                if elapsed > record[2]:
+                    record[2] = elapsed
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    return decorate
+
+def reset():
+    for record in STATS.itervalues():
+        record[:] = [0, 0.0, 0.0]
+
+def rows():
+    """Returns (name, calls, total ms, average ms, max ms) for every function, slowest first"""
+
+    result = [
+        (name, calls, total * 1000, total * 1000 / calls if calls else 0.0, longest * 1000)
+        for name, (calls, total, longest) in STATS.iteritems()
+    ]
+    result.sort(key=lambda row: -row[2])
+    return result
+
+def dump(out=None):
+    out = out or sys.stderr
+    out.write('%-32s %8s %12s %10s %10s\n' % ('function', 'calls', 'total ms', 'avg ms', 'max ms'))
+    for row in rows():
+        out.write('%-32s %8d %12.2f %10.3f %10.3f\n' % row)
+
+if ENABLED:
+    atexit.register(dump)
@@ -0,0 +1,59 @@
+"""
+Debug window with live instrumentation stats (see stats.py).
+"""
+import gtk
+import gobject
+import stats
+
+class StatsWindow(gtk.Window):
+    COLUMNS = ['Function', 'Calls', 'Total ms', 'Avg ms', 'Max ms']
+
+    # refresh interval in milliseconds
+    INTERVAL = 500
+
+    def __init__(self):
+        gtk.Window.__init__(self)
+        self.set_title('Picker Stats')
+        self.set_default_size(520, 240)
+
+        self.store = gtk.ListStore(str, int, float, float, float)
+        view = gtk.TreeView(self.store)
+
+        for column, title in enumerate(self.COLUMNS):
+            renderer = gtk.CellRendererText()
+            col = gtk.TreeViewColumn(title, renderer, text=column)
+            if column > 1:
+                col.set_cell_data_func(renderer, self.format_ms, column)
+            view.append_column(col)
+
+        scroll = gtk.ScrolledWindow()
+        scroll.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+        scroll.add(view)
+
+        reset = gtk.Button('Reset')
+        reset.connect('clicked', self.reset)
+
+        vbox = gtk.VBox(spacing=5)
+        vbox.pack_start(scroll)
+        vbox.pack_start(reset, False)
+        self.add(vbox)
+
+        self.refresh()
+        self.source = gobject.timeout_add(self.INTERVAL, self.refresh)
+        self.connect('destroy', self.on_destroy)
+
+    def format_ms(self, column, renderer, model, it, index):
+        renderer.set_property('text', '%.3f' % model.get_value(it, index))
+
+    def refresh(self):
+        self.store.clear()
+        for row in stats.rows():
+            self.store.append(row)
+        return True
+
+    def reset(self, btn):
+        stats.reset()
+        self.refresh()
+
+    def on_destroy(self, me):
+        gobject.source_remove(self.source)
@@ -0,0 +1,27 @@
+import unittest
+from colorop import numpy, rgb_to_xyz, xyz_to_laab, rgb_to_laab, rgb_to_laab_batch, LAAB_BATCH_TOLERANCE
+from palettes import CTERM_RGB
+
+# every STRIDE-th color of the RGB cube, plus palette colors
+STRIDE = 257
+
+def sample():
+    rgbs = range(0, 1 << 24, STRIDE) + [0xffffff] + list(CTERM_RGB)
+    return [(rgb >> 16, (rgb >> 8) & 0xff, rgb & 0xff) for rgb in rgbs]
+
+class LaabTest(unittest.TestCase):
+    def test_table_conversion_is_exact(self):
+        for rgb in sample()[::64]:
+            self.assertEqual(rgb_to_laab(*rgb), xyz_to_laab(*rgb_to_xyz(*rgb)))
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_batch_within_tolerance(self):
+        rgbs = sample()
+        reference = numpy.array([xyz_to_laab(*rgb_to_xyz(*rgb)) for rgb in rgbs])
+        batch = rgb_to_laab_batch(rgbs)
+
+        self.assertEqual(batch.shape, reference.shape)
+        self.assertLessEqual(numpy.abs(batch - reference).max(), LAAB_BATCH_TOLERANCE)
+
+if __name__ == '__main__':
+    unittest.main()
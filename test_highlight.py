@@ -0,0 +1,71 @@
+import unittest
+from color import Color, Palette
+from convert import make_palettes
+from highlight import parse_line, set_attribute, rewrite_line, ambiguous_matches
+
+class SetAttributeTest(unittest.TestCase):
+    def test_replace(self):
+        self.assertEqual(set_attribute('hi X ctermfg=1 " note\n', 'CTERM', 0, 15),
+                         'hi X ctermfg=15 " note\n')
+
+    def test_append(self):
+        self.assertEqual(set_attribute('hi X guifg=#fff\n', 'CTERM', 0, 15),
+                         'hi X guifg=#fff ctermfg=15\n')
+
+    def test_before_comment(self):
+        self.assertEqual(set_attribute('hi X guifg=#fff " note\n', 'CTERM', 0, 15),
+                         'hi X guifg=#fff ctermfg=15 " note\n')
+
+    def test_before_separator(self):
+        self.assertEqual(set_attribute('hi X guifg=#fff | hi Y guifg=#000\n', 'CTERM', 0, 15),
+                         'hi X guifg=#fff ctermfg=15 | hi Y guifg=#000\n')
+
+    def test_quoted_font(self):
+        self.assertEqual(set_attribute("hi X font='A | B' guifg=#fff\n", 'CTERM', 0, 15),
+                         "hi X font='A | B' guifg=#fff ctermfg=15\n")
+
+class RewriteLineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.palettes = make_palettes()
+
+    def test_overwrite(self):
+        line = rewrite_line('hi X guifg=#ffffff ctermfg=1\n', self.palettes)
+        self.assertEqual(parse_line(line)['CTERM'][0], 15)
+        self.assertTrue(line.endswith('\n'))
+
+    def test_fill_only_adds_missing(self):
+        line = rewrite_line('hi X guifg=#ffffff ctermfg=1\n', self.palettes, False)
+        colors = parse_line(line)
+        self.assertEqual(colors['CTERM'][0], 1)
+        self.assertEqual(colors['TERM'][0], 15)
+
+    def test_fill_only_keeps_none(self):
+        line = rewrite_line('hi X guifg=#808080 ctermfg=NONE\n', self.palettes, False)
+        self.assertIn('ctermfg=NONE', line)
+        self.assertNotIn('ctermfg=8', line)
+
+    def test_unchanged_line_is_same_object(self):
+        line = 'hi X guifg=#ffffff ctermfg=15 termfg=15\n'
+        self.assertIs(rewrite_line(line, self.palettes, False), line)
+
+class AmbiguousMatchesTest(unittest.TestCase):
+    def setUp(self):
+        # 0 and 2 are the same color
+        self.palette = Palette([Color('#000000'), Color('#ffffff'), Color('#000000'), Color('#080808')])
+
+    def test_duplicates_are_not_ambiguous(self):
+        matches = ambiguous_matches('hi X guifg=#000000\n', {'CTERM': self.palette}, 1)
+        self.assertEqual(matches, [])
+
+    def test_runner_up_is_distinct_color(self):
+        matches = ambiguous_matches('hi X guifg=#000000\n', {'CTERM': self.palette}, 10)
+        self.assertEqual(len(matches), 1)
+
+        group, gui, (best, runner_up) = matches[0]
+        self.assertEqual(group, 'CTERM')
+        self.assertEqual(best[0], 0)
+        self.assertEqual(runner_up[0], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,10 @@
+import unittest
+import genpalettes
+
+class GeneratedDataTest(unittest.TestCase):
+    def test_generated_data_is_current(self):
+        # same check as genpalettes.py --check: RGB, L*ab, checksum and CTERM_TO_TERM
+        self.assertEqual(genpalettes.problems(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from server import Server
+
+class ServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server()
+
+    def request(self, request):
+        return json.loads(self.server.handle(json.dumps(request)))
+
+    def test_approximate(self):
+        response = self.request({'id': 1, 'op': 'approximate', 'colors': ['#ff0000', 0xffffff]})
+        self.assertEqual(response, {'id': 1, 'result': [9, 15]})
+
+    def test_non_ascii_color(self):
+        response = self.request({'id': 2, 'op': 'approximate', 'colors': [u'é']})
+        self.assertIn('error', response)
+        self.assertEqual(response['id'], 2)
+
+    def test_colors_not_list(self):
+        response = self.request({'op': 'approximate', 'colors': '#ff0000'})
+        self.assertIn('error', response)
+
+    def test_non_string_line(self):
+        response = self.request({'id': 3, 'op': 'parse', 'lines': [1]})
+        self.assertIn('error', response)
+        self.assertEqual(response['id'], 3)
+
+    def test_serve_after_errors(self):
+        src = StringIO('\n'.join(json.dumps(request) for request in [
+            {'op': 'approximate', 'colors': [u'é']},
+            {'op': 'parse', 'lines': [1]},
+            {'op': 'approximate', 'colors': ['#ffffff']},
+        ]) + '\n')
+        dst = StringIO()
+        self.server.serve_stream(src, dst)
+
+        responses = [json.loads(line) for line in dst.getvalue().splitlines()]
+        self.assertEqual(len(responses), 3)
+        self.assertIn('error', responses[0])
+        self.assertIn('error', responses[1])
+        self.assertEqual(responses[2], {'result': [15]})
+
+class SocketTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_regular_file_is_kept(self):
+        path = os.path.join(self.dir, 'notes.txt')
+        with open(path, 'w') as f:
+            f.write('keep me')
+
+        self.assertRaises(ValueError, Server().serve_socket, path)
+        with open(path) as f:
+            self.assertEqual(f.read(), 'keep me')
+
+if __name__ == '__main__':
+    unittest.main()
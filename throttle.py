@@ -0,0 +1,59 @@
+"""
+Coalescing of frequent calls (like color wheel motion) in GTK main loop.
+"""
+import gobject
+
+class Throttle(object):
+    """
+    Callable that delivers calls to func at most once per interval
+    milliseconds, with arguments of the latest call. The last call is
+    never lost: it's either delivered by the timer or by flush().
+    """
+
+    FRAME = 16
+
+    def __init__(self, func, interval=FRAME):
+        self.func = func
+        self.interval = interval
+        self.args = None
+        self.source = None
+
+    def __call__(self, *args):
+        self.args = args
+        if self.source is None:
+            self.source = gobject.timeout_add(self.interval, self.fire)
+
+    @property
+    def pending(self):
+        return self.source is not None
+
+    def fire(self):
+        self.source = None
+        args, self.args = self.args, None
+        self.func(*args)
+        return False
+
+    def flush(self):
+        """Delivers pending call right now"""
+
+        if self.source is not None:
+            gobject.source_remove(self.source)
+            self.fire()
+
+    def cancel(self):
+        """Drops pending call"""
+
+        if self.source is not None:
+            gobject.source_remove(self.source)
+            self.source = None
+            self.args = None
+
+class Debounce(Throttle):
+    """
+    Callable that delivers the latest call to func only after no calls
+    came for interval milliseconds (like when color wheel stops moving).
+    """
+
+    def __call__(self, *args):
+        self.cancel()
+        Throttle.__call__(self, *args)
@@ -0,0 +1,227 @@
+#!/usr/bin/python2
+"""
+Checks fast approximation paths against the reference scan
+(Palette.approximate_scan) over the whole RGB cube (or every STRIDE-th
+color of it) for CTERM and TERM palettes, using pool of processes.
+
+Reports mismatches, their CIEDE2000 gap (how much worse fast result is)
+and throughput of every path. Mismatches with gap within --tolerance are
+floating point ties and counted separately. Metric paths use other
+distance metrics and are expected to differ, they only show the gap.
+Exits with 1 if exact paths have real mismatches.
+
+Reference scan does a few hundred CTERM colors per second, so
+exhaustive run (--stride 1) takes hours even with many processes.
+"""
+import sys
+import time
+import argparse
+import multiprocessing
+from collections import OrderedDict
+import metrics
+from colorop import numpy
+from color import Color, Palette
+from palettes import CTERM_RGB, CTERM_LAAB, TERM_RGB, TERM_LAAB
+
+SIZE = 1 << 24
+
+# colors checked per pool task
+CHUNK = 256
+
+# name -> (function of palette and targets returning indexes or None if unavailable, exact)
+PATHS = OrderedDict()
+
+def path(name, exact=True):
+    def register(func):
+        PATHS[name] = (func, exact)
+        return func
+    return register
+
+@path('uncached')
+def path_uncached(palette, targets):
+    return [palette.approximate_uncached(target, metrics.CIEDE2000)[0] for target in targets]
+
+@path('pruned')
+def path_pruned(palette, targets):
+    return [palette.approximate_pruned(target)[0] for target in targets]
+
+@path('tree')
+def path_tree(palette, targets):
+    return [palette.approximate_tree(target)[0] for target in targets]
+
+@path('batch')
+def path_batch(palette, targets):
+    if numpy is None:
+        return None
+    return palette.approximate_many(targets, metric=metrics.CIEDE2000)
+
+@path('lut')
+def path_lut(palette, targets):
+    if palette.lut is None:
+        return None
+    return [int(palette.lut[target.rgb]) for target in targets]
+
+def metric_path(name):
+    def func(palette, targets):
+        return [palette.approximate_metric(target, name)[0] for target in targets]
+    return func
+
+for name in metrics.METRICS:
+    if name != metrics.CIEDE2000:
+        path('metric:%s' % name, exact=False)(metric_path(name))
+
+def make_palettes():
+    return OrderedDict([
+        ('CTERM', Palette.precomputed(CTERM_RGB, CTERM_LAAB)),
+        ('TERM', Palette.precomputed(TERM_RGB, TERM_LAAB)),
+    ])
+
+# per-process state of pool workers, see init_worker
+_worker = {}
+
+def init_worker(paths, tolerance):
+    palettes = make_palettes()
+
+    if 'lut' in paths and numpy is not None:
+        # only existing tables are checked, building them is lut.py's job
+        for palette in palettes.itervalues():
+            palette.use_lut(create=False)
+
+    _worker['palettes'] = palettes
+    _worker['paths'] = paths
+    _worker['tolerance'] = tolerance
+
+def verify_chunk(task):
+    """
+    Pool task: checks colors xrange(start, stop, stride) of palette.
+    Returns (palette name, count, reference seconds, {path: stats}),
+    stats are [mismatches, ties, max gap, seconds, examples].
+    """
+
+    name, start, stop, stride = task
+    palette = _worker['palettes'][name]
+    targets = [Color(rgb) for rgb in xrange(start, stop, stride)]
+
+    started = time.time()
+    reference = [palette.approximate_scan(target)[0] for target in targets]
+    reference_time = time.time() - started
+
+    result = {}
+
+    for path_name in _worker['paths']:
+        started = time.time()
+        indexes = PATHS[path_name][0](palette, targets)
+        elapsed = time.time() - started
+
+        if indexes is None:
+            continue
+
+        stats = result[path_name] = [0, 0, 0.0, elapsed, []]
+
+        for target, index, expected in zip(targets, indexes, reference):
+            if index == expected:
+                continue
+
+            gap = (palette[index] - target) - (palette[expected] - target)
+            if abs(gap) <= _worker['tolerance']:
+                stats[1] += 1
+            else:
+                stats[0] += 1
+                if len(stats[4]) < 5:
+                    stats[4].append((str(target), index, expected, gap))
+
+            stats[2] = max(stats[2], gap)
+
+    return name, len(targets), reference_time, result
+
+def make_tasks(names, stride, offset):
+    for name in names:
+        for start in xrange(offset, SIZE, stride * CHUNK):
+            yield name, start, min(start + stride * CHUNK, SIZE), stride
+
+def merge(totals, result):
+    name, count, reference_time, paths = result
+    total = totals.setdefault(name, {'count': 0, 'reference': 0.0, 'paths': OrderedDict()})
+    total['count'] += count
+    total['reference'] += reference_time
+
+    for path_name, (mismatches, ties, gap, elapsed, examples) in paths.iteritems():
+        stats = total['paths'].setdefault(path_name, [0, 0, 0.0, 0.0, []])
+        stats[0] += mismatches
+        stats[1] += ties
+        stats[2] = max(stats[2], gap)
+        stats[3] += elapsed
+        stats[4].extend(examples[:5 - len(stats[4])])
+
+def report(totals, elapsed, out=sys.stdout):
+    """Writes results, returns True if exact paths have no mismatches"""
+
+    ok = True
+
+    for name, total in totals.iteritems():
+        count = total['count']
+        # throughput is per process
+        out.write('%s: %d colors in %.1fs, reference %.0f colors/s\n' % (
+            name, count, elapsed, count / total['reference'] if total['reference'] else 0
+        ))
+        out.write('  %-16s %10s %8s %12s %14s\n' % ('path', 'mismatches', 'ties', 'max gap', 'colors/s'))
+
+        for path_name in PATHS:
+            if path_name not in total['paths']:
+                continue
+
+            mismatches, ties, gap, seconds, examples = total['paths'][path_name]
+            out.write('  %-16s %10d %8d %12.6f %14.0f\n' % (
+                path_name, mismatches, ties, gap, count / seconds if seconds else 0
+            ))
+
+            if PATHS[path_name][1]:
+                ok = ok and not mismatches
+                for color, index, expected, diff in examples:
+                    out.write('    %s: %d instead of %d (gap %.6f)\n' % (color, index, expected, diff))
+
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--stride', type=int, default=4099,
+                        help='check every STRIDE-th color, 1 is exhaustive (default: %(default)s)')
+    parser.add_argument('--offset', type=int, default=0, help='first color checked (default: %(default)s)')
+    parser.add_argument('-p', '--palette', action='append', choices=['CTERM', 'TERM'],
+                        help='palette to check (default: both)')
+    parser.add_argument('--path', action='append', choices=list(PATHS),
+                        help='path to check (default: all available)')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='worker processes (default: %(default)s)')
+    parser.add_argument('-t', '--tolerance', type=float, default=1e-9,
+                        help='CIEDE2000 gap treated as tie (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    names = args.palette or ['CTERM', 'TERM']
+    paths = args.path or list(PATHS)
+    tasks = list(make_tasks(names, args.stride, args.offset))
+
+    started = time.time()
+    totals = OrderedDict()
+    pool = multiprocessing.Pool(args.jobs, init_worker, (paths, args.tolerance))
+
+    try:
+        for done, result in enumerate(pool.imap_unordered(verify_chunk, tasks), 1):
+            merge(totals, result)
+            sys.stderr.write('\r%5.1f%%' % (done * 100.0 / len(tasks)))
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    sys.stderr.write('\n')
+
+    # imap_unordered mixes palettes, report them in requested order
+    totals = OrderedDict((name, totals[name]) for name in names if name in totals)
+    return 0 if report(totals, time.time() - started) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())